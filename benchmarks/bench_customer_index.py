@@ -0,0 +1,71 @@
+"""
+Customer Index Benchmark
+Compares CustomerIndex against the exhaustive customer scan on synthetic names
+
+Sizes run from today's pricing sheet (128 customer slots) up to a customer
+list many times larger than the sheet is expected to grow. The run fails
+if any best match or score differs from the exhaustive scan, and reports
+how many names a lookup scores for known and unknown customers.
+
+Run from the repository root:
+    uv run python benchmarks/bench_customer_index.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import metrics
+from Workflow.matching import CustomerIndex, extract_best
+from synthetic import synthetic_customers, with_typos
+
+
+SIZES = (128, 1_000, 5_000, 10_000)
+
+
+def run(customer_count, query_count, seed=0):
+    rnd = random.Random(seed)
+    customers = synthetic_customers(customer_count, rnd)
+    known = [with_typos(rnd.choice(customers), rnd).strip().upper() for _ in range(query_count)]
+    unknown = [f"UNKNOWN CUSTOMER {i}" for i in range(query_count // 10)]
+    queries = known + unknown
+
+    start = time.perf_counter()
+    exhaustive = extract_best(queries, customers, 'ratio')
+    exhaustive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = CustomerIndex(customers)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = index.extract_best(queries)
+    indexed_time = time.perf_counter() - start
+
+    identical = (exhaustive[0] == indexed[0]).all() and (exhaustive[1] == indexed[1]).all()
+    print(
+        f"{customer_count:>7} customers {len(queries):>6} queries | "
+        f"exhaustive {exhaustive_time:7.3f}s | index build {build_time:6.3f}s "
+        f"lookup {indexed_time:7.3f}s | scored per query: known {_scored(index, known):6.1f} "
+        f"unknown {_scored(index, unknown):7.1f} | identical: {identical}"
+    )
+    return identical
+
+
+def _scored(index, queries):
+    """Names scored per query, including the first, most promising one"""
+    metrics.counters.clear()
+    index.extract_best(queries)
+    return metrics.counters['fuzzy_comparisons'] / len(queries)
+
+
+def main():
+    results = [run(customers, 500) for customers in SIZES]
+    if not all(results):
+        raise SystemExit("CustomerIndex results differ from the exhaustive scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Pipeline Benchmark
+Times each reconciliation stage on synthetic data and checks the results
+against a reference run
+
+The reference under benchmarks/reference/ is the output of the original
+per-row reconcile_data on REFERENCE_ROWS synthetic rows, written by
+make_reference.py and committed. Every run reconciles the same rows and
+must reproduce it, so a speed-up that changes any output row fails
+loudly. No SQL Server or SharePoint access is needed.
+
+Run from the repository root:
+    uv run python benchmarks/bench_pipeline.py
+    uv run python benchmarks/bench_pipeline.py --rows 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from Data.data_sources import parse_sharepoint_file
+from Workflow.alias_cache import AliasCache
+from Workflow.matching import resolve_customers, resolve_employees
+from Workflow.pricing import Pricing
+from Workflow.reconciliation import reconcile_data
+from Workflow.report import create_report
+from synthetic import synthetic_facts, synthetic_pricing, write_pricing_workbook
+
+
+REFERENCE_DIR = os.path.join(BENCH_DIR, 'reference')
+SIZES = (10_000, 100_000, 1_000_000)
+# Rows reconciled by the per-row reference; kept small so it can be committed
+REFERENCE_ROWS = 2_000
+
+
+class Timer:
+    """Collects wall time per stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.stages[name] = time.perf_counter() - start
+        return result
+
+
+def run(rows, workdir, seed=0):
+    timer = Timer()
+    workbook = write_pricing_workbook(
+        os.path.join(workdir, 'pricing.xlsx'), *synthetic_pricing(seed)
+    )
+    employees_df, regular_df, fcc_df = timer('parse_pricing', parse_sharepoint_file, workbook)
+    sql_df = synthetic_facts(rows, employees_df, regular_df, fcc_df, seed)
+
+    pricing = timer('pricing', Pricing, employees_df, regular_df, fcc_df)
+    timer('resolve_employees', resolve_employees, sql_df['EmployeeName'], employees_df)
+    timer(
+        'resolve_customers', resolve_customers,
+        sql_df['CustomerName'], pricing.fcc_customers, pricing.regular_customers
+    )
+
+    alias_cache = AliasCache(':memory:', 'benchmark')
+    results_df, unmatched_employees, unmatched_customers = timer(
+        'reconcile_cold', reconcile_data, sql_df, pricing, alias_cache
+    )
+    timer('reconcile_warm', reconcile_data, sql_df, pricing, alias_cache)
+    alias_cache.close()
+
+    timer(
+        'report', create_report, results_df, unmatched_employees, unmatched_customers,
+        output_file=os.path.join(workdir, f'report_{rows}.xlsx')
+    )
+
+    stages = ' | '.join(f"{name} {seconds:7.3f}s" for name, seconds in timer.stages.items())
+    print(f"{rows:>9} rows | {stages}")
+
+
+def check_reference(workdir):
+    """
+    Reconcile the reference rows and compare with the committed per-row output
+
+    Returns:
+        True when every row and unmatched name matches the reference
+    """
+    workbook = write_pricing_workbook(
+        os.path.join(workdir, 'reference.xlsx'), *synthetic_pricing()
+    )
+    employees_df, regular_df, fcc_df = parse_sharepoint_file(workbook)
+    sql_df = synthetic_facts(REFERENCE_ROWS, employees_df, regular_df, fcc_df)
+
+    alias_cache = AliasCache(':memory:', 'benchmark')
+    results_df, unmatched_employees, unmatched_customers = reconcile_data(
+        sql_df, Pricing(employees_df, regular_df, fcc_df), alias_cache
+    )
+    alias_cache.close()
+
+    results_path, unmatched_path = reference_paths()
+    with open(unmatched_path) as f:
+        if json.load(f) != {
+            'employees': _names_and_scores(unmatched_employees),
+            'customers': _names_and_scores(unmatched_customers)
+        }:
+            print("Unmatched names differ from the reference")
+            return False
+    # Compare values only; categorical and narrowed columns are a storage detail
+    plain = results_df.astype({
+        column: object for column, dtype in results_df.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    })
+    try:
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(results_path), plain, check_dtype=False, check_like=True
+        )
+    except AssertionError as error:
+        print(error)
+        return False
+    return True
+
+
+def reference_paths():
+    """Paths of the reference results and unmatched names"""
+    return (
+        os.path.join(REFERENCE_DIR, f'pipeline_{REFERENCE_ROWS}.parquet'),
+        os.path.join(REFERENCE_DIR, f'pipeline_{REFERENCE_ROWS}_unmatched.json')
+    )
+
+
+def _names_and_scores(unmatched):
+    """Sorted [name, score] pairs of an unmatched_counts() frame"""
+    return sorted([name, float(score)] for name, score in zip(unmatched['name'], unmatched['match_score']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=SIZES, help="Fact row counts to run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        matches = check_reference(workdir)
+        print(f"reference ({REFERENCE_ROWS} rows): {'match' if matches else 'DIFFERS'}")
+        for rows in args.rows:
+            run(rows, workdir)
+    if not matches:
+        raise SystemExit("Pipeline results differ from the reference run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Reference Generator
+Writes the committed pipeline reference with the original per-row
+reconcile_data, so bench_pipeline.py checks every speed-up against it
+
+The original implementation is imported from a checkout of the commit
+before the vectorized pipeline; it needs fuzzywuzzy installed. That
+version raises on text in a price cell, so prices are made numeric first,
+the way the rate card reads them. Only rerun this after a change to
+synthetic.py or REFERENCE_ROWS.
+
+Run from the repository root:
+    git worktree add ../baseline 9437161
+    uv run --with fuzzywuzzy python benchmarks/make_reference.py ../baseline/src
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from Data.data_sources import parse_sharepoint_file
+from Workflow.matching import RANK_ORDER
+from bench_pipeline import REFERENCE_DIR, REFERENCE_ROWS, reference_paths
+from synthetic import synthetic_facts, synthetic_pricing, write_pricing_workbook
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline_src', help="src directory of the per-row implementation checkout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workbook = write_pricing_workbook(
+            os.path.join(workdir, 'pricing.xlsx'), *synthetic_pricing()
+        )
+        employees_df, regular_df, fcc_df = parse_sharepoint_file(workbook)
+    sql_df = synthetic_facts(REFERENCE_ROWS, employees_df, regular_df, fcc_df)
+    regular_df[RANK_ORDER] = regular_df[RANK_ORDER].apply(pd.to_numeric, errors='coerce')
+    fcc_df['Consultant'] = pd.to_numeric(fcc_df['Consultant'], errors='coerce')
+
+    # The checkout has its own config and packages of the same names
+    for name in list(sys.modules):
+        if name == 'config' or name.split('.')[0] in ('Data', 'Workflow'):
+            del sys.modules[name]
+    sys.path.insert(0, os.path.abspath(args.baseline_src))
+    from Workflow.reconciliation import reconcile_data
+
+    results_df, unmatched_employees, unmatched_customers = reconcile_data(
+        sql_df, employees_df, regular_df, fcc_df
+    )
+
+    results_path, unmatched_path = reference_paths()
+    os.makedirs(REFERENCE_DIR, exist_ok=True)
+    results_df.to_parquet(results_path, index=False)
+    with open(unmatched_path, 'w') as f:
+        json.dump({
+            'employees': sorted([name, float(score)] for name, score in set(unmatched_employees)),
+            'customers': sorted([name, float(score)] for name, score in set(unmatched_customers))
+        }, f, indent=2)
+    print(f"Wrote {len(results_df)} reference rows to {results_path}")
+
+
+if __name__ == "__main__":
+    main()
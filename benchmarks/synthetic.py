@@ -0,0 +1,219 @@
+"""
+Synthetic Data
+Realistic fake pricing workbooks and Harvest fact frames for offline benchmarks
+
+The workbook uses the cell layout parse_sharepoint_file expects, and the
+fact rows carry the quirks of the real extract: "SKA - Sam K. Andersen"
+employee names, customer names with typos and odd casing, FCC and regular
+customers, zero/blank/text prices that exercise the rank fallback, and a
+share of names that match nothing.
+
+Usage from another benchmark:
+    from synthetic import synthetic_pricing, write_pricing_workbook, synthetic_facts
+"""
+
+import random
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+
+FIRST_NAMES = [
+    'Sam', 'Søren', 'Anne', 'Mette', 'Lars', 'Jens', 'Peter', 'Rune', 'Nanna', 'Kim',
+    'Johannes', 'Andreas', 'Morten', 'Camilla', 'Simon', 'Louise', 'Mads', 'Ida', 'Dung'
+]
+MIDDLE_NAMES = ['K.', 'B.', 'Trøst', 'Prang', 'Mosbæk', 'My', 'Holm', 'R.']
+LAST_NAMES = [
+    'Andersen', 'Corfitsen', 'Lauritsen', 'Gunnersen', 'Rokkjær', 'Jensen', 'Grosbøl',
+    'Hoa', 'Hermansen', 'Albertsen', 'Nielsen', 'Kristensen', 'Østergaard', 'Madsen'
+]
+TITLES = [
+    'Junior Dev', 'Junior BA', 'Consultant', 'Dev', 'Support', 'Senior', 'Senior DEV',
+    'Senior dev', 'Senior BA', 'Senior BA/TL', 'TL', 'Principal Dev', 'Principal BA',
+    'Data Scientist', 'Architect'
+]
+# Rank columns in the workbook's regular pricing block (columns C-H)
+PRICE_COLUMNS = [
+    'Junior Consultant', 'Consultant', 'Senior Consultant',
+    'Principal Consultant', 'Data Scientist', 'Support'
+]
+# Pieces of synthetic company names, e.g. VESTHOLM LOGISTICS A/S
+SYLLABLES = [
+    'NOR', 'DAN', 'SKO', 'VEST', 'MED', 'ICO', 'ENER', 'GI', 'TEK', 'BYG', 'AGRO',
+    'MAR', 'INE', 'LUND', 'HOLM', 'STRAND', 'KOB', 'TRA', 'VIK', 'SOL', 'BRO', 'HAV'
+]
+WORDS = ['GROUP', 'HOLDING', 'SYSTEMS', 'PHARMA', 'LOGISTICS', 'FOODS', 'DESIGN', 'INVEST']
+SUFFIXES = ['A/S', 'APS', 'I/S', 'AB', '']
+# The workbook's fixed blocks hold at most this many customers
+MAX_REGULAR_CUSTOMERS = 104
+MAX_FCC_CUSTOMERS = 23
+
+
+def synthetic_pricing(seed=0, employee_count=60, regular_count=100, fcc_count=20):
+    """
+    Pricing tables shaped like parse_sharepoint_file output
+
+    Args:
+        seed: Random seed
+        employee_count: Number of employees
+        regular_count: Number of regular customers (at most 104)
+        fcc_count: Number of FCC customers (at most 23)
+
+    Returns:
+        Tuple of (employees_df, regular_df, fcc_df)
+    """
+    if regular_count > MAX_REGULAR_CUSTOMERS or fcc_count > MAX_FCC_CUSTOMERS:
+        raise ValueError("The pricing workbook layout holds 104 regular and 23 FCC customers")
+    rnd = random.Random(seed)
+
+    names = set()
+    while len(names) < employee_count:
+        parts = [rnd.choice(FIRST_NAMES)]
+        if rnd.random() < 0.4:
+            parts.append(rnd.choice(MIDDLE_NAMES))
+        parts.append(rnd.choice(LAST_NAMES))
+        names.add(' '.join(parts))
+    employees_df = pd.DataFrame({
+        'name': sorted(names),
+        'title': [rnd.choice(TITLES) for _ in names]
+    })
+
+    customers = synthetic_customers(regular_count + fcc_count, rnd)
+    rnd.shuffle(customers)
+    # Some customers are on both price lists; FCC wins when matching
+    fcc_names = customers[:fcc_count]
+    regular_names = sorted(customers[fcc_count:] + rnd.sample(fcc_names, min(3, fcc_count)))[:regular_count]
+
+    regular = {'customer': regular_names}
+    for column in PRICE_COLUMNS:
+        regular[column] = [_price(rnd) for _ in regular_names]
+    regular_df = pd.DataFrame(regular)
+
+    fcc_df = pd.DataFrame({
+        'customer': fcc_names,
+        'Consultant': [round(rnd.uniform(1150, 1400), 2) for _ in fcc_names]
+    })
+    return employees_df, regular_df, fcc_df
+
+
+def synthetic_customers(count, rnd):
+    """Distinct upper-case company names, e.g. VESTHOLM LOGISTICS A/S"""
+    names = set()
+    while len(names) < count:
+        brand = ''.join(rnd.sample(SYLLABLES, rnd.randint(2, 4)))
+        words = rnd.sample(WORDS, rnd.randint(0, 2))
+        names.add(' '.join([brand, *words, rnd.choice(SUFFIXES)]).strip())
+    return sorted(names)
+
+
+def with_typos(name, rnd):
+    """Customer name as it might be typed into Harvest"""
+    chars = list(name.lower() if rnd.random() < 0.5 else name)
+    for _ in range(rnd.randint(0, 2)):
+        chars[rnd.randrange(len(chars))] = rnd.choice('abcdefghijklmnopqrstuvwxyz ./')
+    return ''.join(chars)
+
+
+def _price(rnd):
+    """A rate cell: usually a price, sometimes zero, blank or a note"""
+    roll = rnd.random()
+    if roll < 0.15:
+        return 0
+    if roll < 0.25:
+        return np.nan
+    if roll < 0.27:
+        return '1541/1383'
+    return round(rnd.uniform(1100, 2200), 3)
+
+
+def write_pricing_workbook(path, employees_df, regular_df, fcc_df):
+    """
+    Write pricing tables into the "Hourly rate" workbook layout
+
+    Regular customers go in rows 7-110 (name in A, prices in C-H), FCC
+    customers in rows 116-139 below a "Customer" header (A-B) and
+    employees in columns E-F below a "Consulent" header in row 119.
+
+    Returns:
+        path
+    """
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    sheet.title = 'Hourly rate'
+    sheet['A6'] = 'Customer'
+    for offset, column in enumerate(PRICE_COLUMNS):
+        sheet.cell(row=6, column=3 + offset, value=column)
+
+    for i, row in enumerate(regular_df.itertuples(index=False)):
+        sheet.cell(row=7 + i, column=1, value=row[0])
+        for offset, price in enumerate(row[1:]):
+            sheet.cell(row=7 + i, column=3 + offset, value=None if pd.isna(price) else price)
+
+    sheet['A116'] = 'Customer'
+    sheet['B116'] = 'Consultant'
+    for i, row in enumerate(fcc_df.itertuples(index=False)):
+        sheet.cell(row=117 + i, column=1, value=row.customer)
+        sheet.cell(row=117 + i, column=2, value=row.Consultant)
+
+    sheet['E119'] = 'Consulent'
+    sheet['F119'] = 'Title'
+    for i, row in enumerate(employees_df.itertuples(index=False)):
+        sheet.cell(row=120 + i, column=5, value=row.name)
+        sheet.cell(row=120 + i, column=6, value=row.title)
+
+    wb.save(path)
+    return path
+
+
+def synthetic_facts(rows, employees_df, regular_df, fcc_df, seed=0, start='2026-01-01', days=90):
+    """
+    Billable fact rows with get_billable_data's columns
+
+    Names are drawn from a fixed pool of spellings per employee and
+    customer, so the distinct-name count stays realistic as rows grow.
+
+    Args:
+        rows: Number of fact rows
+        employees_df, regular_df, fcc_df: Pricing tables the names refer to
+        seed: Random seed
+        start: First date
+        days: Number of days the dates spread over
+
+    Returns:
+        DataFrame with columns: Hours, BillableRate, BillableAmount, Date, CustomerName, EmployeeName
+    """
+    rnd = random.Random(seed)
+    rng = np.random.default_rng(seed)
+
+    employee_names = [sql_employee_name(name, rnd) for name in employees_df['name']]
+    employee_names += [f"XX{i} - Unknown Freelancer {i}" for i in range(3)]
+
+    customers = list(dict.fromkeys(list(regular_df['customer']) + list(fcc_df['customer'])))
+    customer_names = customers + [with_typos(rnd.choice(customers), rnd) for _ in customers]
+    customer_names += [f"Internal Project {i}" for i in range(3)]
+
+    employee_idx = rng.integers(0, len(employee_names), rows)
+    customer_idx = rng.integers(0, len(customer_names), rows)
+    hours = rng.choice([0.25, 0.5, 1.0, 1.5, 2.0, 3.75, 7.5], rows)
+    # Typical Harvest rates, with discounts and a few overcharges
+    rates = rng.choice([1000.0, 1150.0, 1304.838, 1380.92, 1510.059, 1822.485, 2014.1], rows)
+    rates *= rng.choice([1.0, 1.0, 1.0, 0.9, 1.05], rows)
+
+    return pd.DataFrame({
+        'Hours': hours,
+        'BillableRate': rates.round(2),
+        'BillableAmount': (hours * rates).round(2),
+        'Date': pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, rows), unit='D'),
+        'CustomerName': np.array(customer_names, dtype=object)[customer_idx],
+        'EmployeeName': np.array(employee_names, dtype=object)[employee_idx]
+    })
+
+
+def sql_employee_name(name, rnd):
+    """Harvest spelling of an employee, e.g. "SKA - Sam K. Andersen" """
+    initials = ''.join(part[0] for part in name.replace('.', ' ').split()).upper()
+    if rnd.random() < 0.2:
+        # Stray punctuation after the first name shows up in the extract
+        name = name.replace(' ', '. ', 1)
+    return f"{initials} - {name}"
@@ -1,41 +1,232 @@
 """
 Data Sources Module
-Handles all data connections: SQL Server and SharePoint
+Handles all data connections: SQL Server (or its local mirror) and SharePoint
 """
 
 import pandas as pd
-import pyodbc
-from office365.sharepoint.client_context import ClientContext
-from office365.runtime.auth.user_credential import UserCredential
-from office365.sharepoint.files.file import File
-import io
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL
+from sqlalchemy.pool import NullPool
+import hashlib
+import os
+import sqlite3
+import numpy as np
+import openpyxl
+from datetime import date, datetime, timedelta
 import config
+import metrics
+
+
+# Local copy of the SharePoint pricing workbook
+PRICING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Hourly rate 2026.xlsx")
+
+
+# Dates bind as ISO text in the local warehouse, the way they are stored there
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+
+
+class SqlServerSource:
+    """The Power BI SQL Server warehouse"""
+    
+    # Extracts travel over the network, so Data.snapshot_cache keeps local copies
+    caches_snapshots = True
+    # pyodbc returns dates as datetimes already
+    date_columns = None
+    
+    def new_engine(self):
+        """Engine with connection pooling and pyodbc's bulk executemany"""
+        conn_str = (
+            f"DRIVER={{{config.SQL_DRIVER}}};"
+            f"SERVER={config.SQL_SERVER};"
+            f"DATABASE={config.SQL_DATABASE};"
+            f"UID={config.SQL_USERNAME};"
+            f"PWD={config.SQL_PASSWORD}"
+        )
+        return create_engine(
+            URL.create("mssql+pyodbc", query={"odbc_connect": conn_str}),
+            pool_size=config.SQL_POOL_SIZE,
+            pool_pre_ping=True,
+            fast_executemany=True
+        )
+    
+    def row_limit(self, n):
+        """Tuple of (clause after SELECT, clause at the end of the query) keeping the first n rows"""
+        return f"TOP {int(n)}", ""
+    
+    def temp_table(self, name):
+        """Name of a session temp table"""
+        return f"#{name}"
+    
+    def month_of(self, column):
+        """YYYY-MM text of a date column"""
+        return f"CONVERT(CHAR(7), {column}, 120)"
+
+
+class LocalSource:
+    """
+    The local SQLite warehouse (see Data.local_warehouse)
+    
+    The file is attached as PowerBIData, so the SQL Server queries run unchanged.
+    """
+    
+    # The file already reads at disk speed
+    caches_snapshots = False
+    # Dates are stored as ISO text
+    date_columns = ['Date']
+    
+    def __init__(self, path=None):
+        """
+        Args:
+            path: SQLite file; config.LOCAL_WAREHOUSE_FILE by default
+        """
+        self.path = path or config.LOCAL_WAREHOUSE_FILE
+    
+    def new_engine(self):
+        """Engine over an in-memory database with the warehouse attached"""
+        path = self.path
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Local warehouse not found at: {path}\n"
+                f"Run 'python src/sync_warehouse.py' to copy it from SQL Server"
+            )
+        
+        engine = create_engine("sqlite://", poolclass=NullPool)
+        
+        @event.listens_for(engine, "connect")
+        def attach_warehouse(dbapi_connection, connection_record):
+            dbapi_connection.execute("ATTACH DATABASE ? AS PowerBIData", (path,))
+        
+        return engine
+    
+    def row_limit(self, n):
+        """Tuple of (clause after SELECT, clause at the end of the query) keeping the first n rows"""
+        return "", f"LIMIT {int(n)}"
+    
+    def temp_table(self, name):
+        """Name of a session temp table"""
+        return f"temp.{name}"
+    
+    def month_of(self, column):
+        """YYYY-MM text of a date column"""
+        return f"strftime('%Y-%m', {column})"
+
+
+SOURCES = {'sqlserver': SqlServerSource, 'local': LocalSource}
+
+
+_source = None
+_engine = None
+
+
+def get_source():
+    """Source object for config.DATA_SOURCE ('sqlserver' or 'local'), created on first use"""
+    global _source
+    if _source is None:
+        if config.DATA_SOURCE not in SOURCES:
+            raise ValueError(f"Unknown DATA_SOURCE: {config.DATA_SOURCE}")
+        _source = SOURCES[config.DATA_SOURCE]()
+    return _source
+
+
+def get_engine():
+    """Shared engine for the configured source, created on first use"""
+    global _engine
+    if _engine is None:
+        _engine = get_source().new_engine()
+    return _engine
+
+
+def load_temp_table(conn, name, columns, rows):
+    """
+    Create a session temp table and bulk-insert rows into it
+    
+    The table lives as long as the connection, so build and query it on
+    the same one. An existing table of that name is replaced.
+    
+    Args:
+        conn: Connection from connect_to_sql()
+        name: Table name without prefix, see the source's temp_table()
+        columns: List of "name TYPE" column definitions
+        rows: List of tuples in column order
+    
+    Returns:
+        Qualified table name to use in queries
+    """
+    table = get_source().temp_table(name)
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+    conn.exec_driver_sql(f"CREATE TABLE {table} ({', '.join(columns)})")
+    if rows:
+        placeholders = ', '.join('?' * len(columns))
+        conn.exec_driver_sql(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+    return table
+
+
+def reset_engine():
+    """Forget an engine inherited by a forked worker, leaving the parent's connections open"""
+    global _engine
+    if _engine is not None:
+        _engine.dispose(close=False)
+        _engine = None
 
 
 def connect_to_sql():
-    """Create SQL Server connection"""
-    conn_str = (
-        f"DRIVER={{{config.SQL_DRIVER}}};"
-        f"SERVER={config.SQL_SERVER};"
-        f"DATABASE={config.SQL_DATABASE};"
-        f"UID={config.SQL_USERNAME};"
-        f"PWD={config.SQL_PASSWORD}"
-    )
-    return pyodbc.connect(conn_str)
+    """Borrow a pooled connection to the billable data source; close() returns it to the pool"""
+    return get_engine().connect()
 
 
-def get_billable_data(month_filter=None):
+def get_billable_data(start=None, end=None, months=None):
     """
-    Extract billable data from SQL Server
+    Extract billable data from the configured source
+    
+    Filter either by date range or by a list of months, not both.
     
     Args:
-        month_filter: Optional month filter in YYYY-MM format
+        start: Optional first date to include
+        end: Optional date to stop before (exclusive)
+        months: Optional list of months in YYYY-MM format
     
     Returns:
         DataFrame with columns: Hours, BillableRate, BillableAmount, Date, CustomerName, EmployeeName
     """
     conn = connect_to_sql()
     
+    query, params = billable_query(start, end, months)
+    df = pd.read_sql(query, conn, params=params, parse_dates=get_source().date_columns)
+    conn.close()
+    
+    return df
+
+
+def iter_billable_data(chunksize, start=None, end=None, months=None):
+    """
+    Extract billable data from the configured source in fixed-size chunks
+    
+    Args:
+        chunksize: Rows per chunk
+        start, end, months: Same filters as get_billable_data
+    
+    Yields:
+        DataFrames with the get_billable_data columns
+    """
+    conn = connect_to_sql()
+    
+    query, params = billable_query(start, end, months)
+    try:
+        yield from pd.read_sql(
+            query, conn, params=params, chunksize=chunksize, parse_dates=get_source().date_columns
+        )
+    finally:
+        conn.close()
+
+
+def billable_query(start=None, end=None, months=None):
+    """
+    Build the billable fact query
+    
+    Returns:
+        Tuple of (query, parameters)
+    """
     query = """
     SELECT 
         f.Hours,
@@ -50,94 +241,175 @@ def get_billable_data(month_filter=None):
     WHERE f.IsBillableKey = 1
     """
     
-    if month_filter:
-        query += f" AND FORMAT(f.Date, 'yyyy-MM') = '{month_filter}'"
+    predicate, params = date_filter(start, end, months)
+    return query + predicate, tuple(params)
+
+
+def date_filter(start=None, end=None, months=None):
+    """
+    Build a sargable, parameterized predicate on f.Date
     
-    df = pd.read_sql(query, conn)
-    conn.close()
+    Args:
+        start: Optional first date to include
+        end: Optional date to stop before (exclusive)
+        months: Optional list of months in YYYY-MM format
     
-    return df
+    Returns:
+        Tuple of (SQL fragment starting with " AND", list of parameters)
+    """
+    if months and (start or end):
+        raise ValueError("Filter by start/end or by months, not both")
+    
+    if months:
+        ranges = month_ranges(months)
+    elif start or end:
+        ranges = [(start, end)]
+    else:
+        return "", []
+    
+    clauses = []
+    params = []
+    for range_start, range_end in ranges:
+        bounds = []
+        if range_start:
+            bounds.append("f.Date >= ?")
+            params.append(range_start)
+        if range_end:
+            bounds.append("f.Date < ?")
+            params.append(range_end)
+        clauses.append(f"({' AND '.join(bounds)})")
+    
+    return f" AND ({' OR '.join(clauses)})", params
 
 
-def parse_sharepoint_file(file_bytes):
+def month_ranges(months):
+    """
+    Collapse YYYY-MM months into [start, end) date ranges, merging consecutive months
+    
+    Args:
+        months: List of months in YYYY-MM format
+    
+    Returns:
+        Sorted list of (start_date, end_date) tuples
+    """
+    ranges = []
+    for month in sorted(set(months)):
+        month_start = datetime.strptime(month, '%Y-%m').date()
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+        if ranges and ranges[-1][1] == month_start:
+            ranges[-1] = (ranges[-1][0], month_end)
+        else:
+            ranges.append((month_start, month_end))
+    return ranges
+
+
+def parse_sharepoint_file(workbook):
     """
     Parse SharePoint Excel file into structured data
     
+    Only the three pricing blocks are read, in openpyxl read-only mode.
+    
     Args:
-        file_bytes: BytesIO object containing Excel file
+        workbook: Path or file-like object containing the Excel file
     
     Returns:
         Tuple of (employees_df, regular_pricing_df, fcc_pricing_df)
     """
-    df_raw = pd.read_excel(file_bytes, sheet_name=0, header=None)
-    
-    # Extract employee list (rows 118+, columns E=4 and F=5)
-    employees = []
-    for i in range(118, len(df_raw)):
-        name = df_raw.iloc[i, 4]
-        title = df_raw.iloc[i, 5]
-        if pd.notna(name) and pd.notna(title) and name not in ['Consulent', 'NUMBERS']:
-            employees.append({
-                'name': str(name).strip(),
-                'title': str(title).strip()
-            })
-    
-    employees_df = pd.DataFrame(employees)
-    
-    # Extract regular customer pricing (rows 6-109)
-    regular_pricing = []
-    for i in range(6, 110):
-        customer = df_raw.iloc[i, 0]
-        if pd.notna(customer):
-            regular_pricing.append({
-                'customer': str(customer).strip(),
-                'Junior Consultant': df_raw.iloc[i, 2],
-                'Consultant': df_raw.iloc[i, 3],
-                'Senior Consultant': df_raw.iloc[i, 4],
-                'Principal Consultant': df_raw.iloc[i, 5],
-                'Data Scientist': df_raw.iloc[i, 6],
-                'Support': df_raw.iloc[i, 7]
-            })
-    
-    regular_df = pd.DataFrame(regular_pricing)
-    
-    # Extract FCC customer pricing (rows 115-138)
-    fcc_pricing = []
-    for i in range(115, 139):
-        customer = df_raw.iloc[i, 0]
-        price = df_raw.iloc[i, 1]
-        if pd.notna(customer) and customer != 'Customer':
-            fcc_pricing.append({
-                'customer': str(customer).strip(),
-                'Consultant': price
-            })
-    
-    fcc_df = pd.DataFrame(fcc_pricing)
+    wb = openpyxl.load_workbook(workbook, read_only=True, data_only=True)
+    sheet = wb.worksheets[0]
+    
+    # Extract employee list (rows 119+, columns E and F)
+    employees = _read_block(sheet, ['name', 'title'], min_row=119, min_col=5)
+    employees = employees[
+        employees['name'].notna()
+        & employees['title'].notna()
+        & ~employees['name'].isin(['Consulent', 'NUMBERS'])
+    ]
+    employees_df = pd.DataFrame({
+        'name': employees['name'].astype(str).str.strip(),
+        'title': employees['title'].astype(str).str.strip()
+    }).reset_index(drop=True)
+    
+    # Extract regular customer pricing (rows 7-110, column A and prices in C-H)
+    regular = pd.concat([
+        _read_block(sheet, ['customer'], min_row=7, max_row=110),
+        _read_block(
+            sheet,
+            ['Junior Consultant', 'Consultant', 'Senior Consultant',
+             'Principal Consultant', 'Data Scientist', 'Support'],
+            min_row=7, max_row=110, min_col=3
+        )
+    ], axis=1)
+    regular = regular[regular['customer'].notna()]
+    regular['customer'] = regular['customer'].astype(str).str.strip()
+    regular_df = regular.reset_index(drop=True)
+    
+    # Extract FCC customer pricing (rows 116-139, columns A-B)
+    fcc = _read_block(sheet, ['customer', 'Consultant'], min_row=116, max_row=139)
+    fcc = fcc[fcc['customer'].notna() & (fcc['customer'] != 'Customer')]
+    fcc['customer'] = fcc['customer'].astype(str).str.strip()
+    fcc_df = fcc.reset_index(drop=True)
+    
+    wb.close()
     
     return employees_df, regular_df, fcc_df
 
 
+def _read_block(sheet, columns, min_row, max_row=None, min_col=1):
+    """Read a rectangular cell range into a DataFrame with the given column names"""
+    rows = sheet.iter_rows(
+        min_row=min_row,
+        max_row=max_row,
+        min_col=min_col,
+        max_col=min_col + len(columns) - 1,
+        values_only=True
+    )
+    block = pd.DataFrame(list(rows), columns=columns)
+    return block.where(block.notna(), np.nan)
+
+
 def get_sharepoint_data():
     """
-    Read and parse local Excel file (previously from SharePoint)
+    Read and parse the local Excel file (kept current by Data.sharepoint_sync)
+    
+    The parsed tables are cached on disk and reused until the workbook's
+    content changes.
     
     Returns:
         Tuple of (employees_df, regular_pricing_df, fcc_pricing_df)
     """
-    import os
-    
-    # Path to local Excel file (relative to this script)
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(script_dir, "Hourly rate 2026.xlsx")
-    
-    if not os.path.exists(file_path):
+    if not os.path.exists(PRICING_FILE):
         raise FileNotFoundError(
-            f"Excel file not found at: {file_path}\n"
+            f"Excel file not found at: {PRICING_FILE}\n"
             f"Please ensure 'Hourly rate 2026.xlsx' is in the src/Data/ folder"
         )
     
-    # Read file into BytesIO for consistent parsing
-    with open(file_path, 'rb') as f:
-        bytes_file = io.BytesIO(f.read())
+    # Cheap mtime/size check first, content hash only when the file was touched
+    stat = os.stat(PRICING_FILE)
+    cached = pd.read_pickle(config.PRICING_CACHE_FILE) if os.path.exists(config.PRICING_CACHE_FILE) else None
+    if cached and (cached['mtime'], cached['size']) == (stat.st_mtime, stat.st_size):
+        metrics.count('pricing_cache_hits')
+        return cached['tables']
+    
+    sha256 = file_sha256(PRICING_FILE)
+    if cached and cached['sha256'] == sha256:
+        metrics.count('pricing_cache_hits')
+        tables = cached['tables']
+    else:
+        metrics.count('pricing_cache_misses')
+        tables = parse_sharepoint_file(PRICING_FILE)
     
-    return parse_sharepoint_file(bytes_file)
\ No newline at end of file
+    pd.to_pickle(
+        {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': sha256, 'tables': tables},
+        config.PRICING_CACHE_FILE
+    )
+    return tables
+
+
+def file_sha256(path):
+    """Hex SHA-256 digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,119 @@
+"""
+Local Warehouse Module
+Embedded SQLite mirror of the Harvest fact table and its two dimensions
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+import pandas as pd
+import config
+import metrics
+from Data.data_sources import SqlServerSource
+
+
+# Mirrored tables and the columns the reconciliation reads from them
+TABLES = {
+    'FactTable_HARVEST_Actual': [
+        'Date', 'CustomerKey', 'EmployeeKey', 'Hours', 'BillableRate', 'BillableAmount', 'IsBillableKey'
+    ],
+    'DimCustomer_Tabular_Flat': ['CustomerKey', 'CustomerName'],
+    'DimEmployee_Tabular_Flat': ['EmployeeKey', 'EmployeeName']
+}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS FactTable_HARVEST_Actual (
+        Date TEXT NOT NULL,
+        CustomerKey INTEGER,
+        EmployeeKey INTEGER,
+        Hours REAL,
+        BillableRate REAL,
+        BillableAmount REAL,
+        IsBillableKey INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS ix_fact_date ON FactTable_HARVEST_Actual (Date);
+    CREATE TABLE IF NOT EXISTS DimCustomer_Tabular_Flat (CustomerKey INTEGER, CustomerName TEXT);
+    CREATE INDEX IF NOT EXISTS ix_customer_key ON DimCustomer_Tabular_Flat (CustomerKey);
+    CREATE TABLE IF NOT EXISTS DimEmployee_Tabular_Flat (EmployeeKey INTEGER, EmployeeName TEXT);
+    CREATE INDEX IF NOT EXISTS ix_employee_key ON DimEmployee_Tabular_Flat (EmployeeKey);
+    CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def sync_local_warehouse(since=None, full=False, path=None, engine=None):
+    """
+    Copy SQL Server data into the local warehouse, incrementally by date
+    
+    Dimensions are copied in full. Fact rows are replaced from `since` on;
+    by default that is config.LOCAL_SYNC_LOOKBACK_DAYS before the newest
+    local row, so late edits to recent entries are picked up. Older rows
+    deleted upstream stay until a full sync.
+    
+    Args:
+        since: First date to copy again; derived from the local data when omitted
+        full: Replace all fact rows
+        path: SQLite file; config.LOCAL_WAREHOUSE_FILE by default
+        engine: SQLAlchemy engine to copy from; a new SQL Server engine by default
+    
+    Returns:
+        Tuple of (first date copied or None for everything, fact rows copied)
+    """
+    path = path or config.LOCAL_WAREHOUSE_FILE
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    
+    if full:
+        since = None
+    elif since is None:
+        newest = conn.execute("SELECT MAX(Date) FROM FactTable_HARVEST_Actual").fetchone()[0]
+        if newest:
+            since = datetime.fromisoformat(newest).date() - timedelta(days=config.LOCAL_SYNC_LOOKBACK_DAYS)
+    
+    remote = (engine or SqlServerSource().new_engine()).connect()
+    rows = 0
+    try:
+        # One transaction: readers never see a half-synced mirror
+        with conn:
+            for table in ['DimCustomer_Tabular_Flat', 'DimEmployee_Tabular_Flat']:
+                conn.execute(f"DELETE FROM {table}")
+                for chunk in _read_table(remote, table):
+                    _insert(conn, table, chunk)
+            
+            fact = 'FactTable_HARVEST_Actual'
+            if since is None:
+                conn.execute(f"DELETE FROM {fact}")
+            else:
+                conn.execute(f"DELETE FROM {fact} WHERE Date >= ?", (since,))
+            for chunk in _read_table(remote, fact, since):
+                chunk['Date'] = pd.to_datetime(chunk['Date']).dt.strftime('%Y-%m-%d %H:%M:%S')
+                _insert(conn, fact, chunk)
+                rows += len(chunk)
+            
+            conn.executemany(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+                [('synced_at', datetime.now().isoformat(timespec='seconds')),
+                 ('synced_since', str(since) if since else '')]
+            )
+    finally:
+        remote.close()
+        conn.close()
+    
+    metrics.count('warehouse_rows_synced', rows)
+    return since, rows
+
+
+def _read_table(remote, table, since=None):
+    """Chunks of a mirrored table from SQL Server, fact rows from `since` on"""
+    query = f"SELECT {', '.join(TABLES[table])} FROM PowerBIData.{table}"
+    params = ()
+    if since is not None:
+        query += " WHERE Date >= ?"
+        params = (since,)
+    return pd.read_sql(query, remote, params=params, chunksize=config.STREAM_CHUNK_SIZE)
+
+
+def _insert(conn, table, chunk):
+    columns = TABLES[table]
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        chunk[columns].astype(object).where(chunk[columns].notna(), None).itertuples(index=False, name=None)
+    )
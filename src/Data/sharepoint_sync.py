@@ -0,0 +1,165 @@
+"""
+SharePoint Sync Module
+Keeps the local pricing workbook in step with its SharePoint original
+"""
+
+import json
+import os
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from office365.runtime.auth.user_credential import UserCredential
+from office365.sharepoint.client_context import ClientContext
+import config
+import metrics
+from Data.data_sources import PRICING_FILE
+
+
+# content is None when the remote file matches the given validators
+FetchResult = namedtuple('FetchResult', ['content', 'etag', 'last_modified'])
+
+
+class SharePointTransport:
+    """Fetch a file from a SharePoint document library"""
+    
+    def __init__(self, site_url, username, password, file_path):
+        """
+        Args:
+            site_url: Full URL of the SharePoint site
+            username, password: Microsoft 365 credentials
+            file_path: Server-relative path of the file
+        """
+        self.site_url = site_url
+        self.username = username
+        self.password = password
+        self.file_path = file_path
+    
+    def fetch(self, etag=None, last_modified=None):
+        """
+        Download the file unless its ETag or modification time still matches
+        
+        Returns:
+            FetchResult
+        """
+        ctx = ClientContext(self.site_url).with_credentials(
+            UserCredential(self.username, self.password)
+        )
+        file = ctx.web.get_file_by_server_relative_path(self.file_path).get().execute_query()
+        remote_etag = file.properties.get('ETag')
+        remote_modified = str(file.time_last_modified)
+        
+        if _unchanged(etag, last_modified, remote_etag, remote_modified):
+            return FetchResult(None, remote_etag, remote_modified)
+        
+        content = file.get_content().execute_query().value
+        return FetchResult(content, remote_etag, remote_modified)
+
+
+class HttpTransport:
+    """Fetch a file with a conditional HTTP GET (If-None-Match / If-Modified-Since)"""
+    
+    def __init__(self, url, headers=None, timeout=60):
+        """
+        Args:
+            url: File URL
+            headers: Extra request headers, e.g. Authorization
+            timeout: Seconds to wait for the server
+        """
+        self.url = url
+        self.headers = headers or {}
+        self.timeout = timeout
+    
+    def fetch(self, etag=None, last_modified=None):
+        """
+        Download the file unless the server answers 304 Not Modified
+        
+        Returns:
+            FetchResult
+        """
+        headers = dict(self.headers)
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        request = urllib.request.Request(self.url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return FetchResult(
+                    response.read(),
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified')
+                )
+        except urllib.error.HTTPError as error:
+            if error.code == 304:
+                return FetchResult(
+                    None,
+                    error.headers.get('ETag', etag),
+                    error.headers.get('Last-Modified', last_modified)
+                )
+            raise
+
+
+def default_transport():
+    """SharePointTransport from the .env settings, None when SharePoint is not configured"""
+    if not (config.SHAREPOINT_SITE_URL and config.SHAREPOINT_FILE_PATH):
+        return None
+    return SharePointTransport(
+        config.SHAREPOINT_SITE_URL,
+        config.SHAREPOINT_USERNAME,
+        config.SHAREPOINT_PASSWORD,
+        config.SHAREPOINT_FILE_PATH
+    )
+
+
+def sync_pricing():
+    """Download the workbook if it changed on SharePoint; errors stop the run"""
+    transport = default_transport()
+    if transport is None:
+        return
+    if sync_pricing_file(transport):
+        print("   Downloaded updated pricing workbook from SharePoint")
+
+
+def sync_pricing_file(transport, path=PRICING_FILE, state_file=None):
+    """
+    Refresh the local workbook copy if the remote one changed
+    
+    The remote ETag and modification time are kept in state_file;
+    while they match, nothing is downloaded.
+    
+    Args:
+        transport: Object with fetch(etag, last_modified) -> FetchResult
+        path: Local workbook path
+        state_file: JSON file holding the validators; config.PRICING_SYNC_STATE_FILE by default
+    
+    Returns:
+        True if a new copy was downloaded, False if the local copy is current
+    """
+    state_file = state_file or config.PRICING_SYNC_STATE_FILE
+    state = {}
+    if os.path.exists(path) and os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+    
+    result = transport.fetch(state.get('etag'), state.get('last_modified'))
+    if result.content is None:
+        metrics.count('pricing_download_skipped')
+        return False
+    
+    # Replace atomically so readers never see a half-written workbook
+    partial = f"{path}.partial"
+    with open(partial, 'wb') as f:
+        f.write(result.content)
+    os.replace(partial, path)
+    with open(state_file, 'w') as f:
+        json.dump({'etag': result.etag, 'last_modified': result.last_modified}, f)
+    metrics.count('pricing_downloads')
+    return True
+
+
+def _unchanged(etag, last_modified, remote_etag, remote_modified):
+    """Whether stored validators still describe the remote file"""
+    if etag and remote_etag:
+        return etag == remote_etag
+    return bool(last_modified) and last_modified == remote_modified
@@ -0,0 +1,116 @@
+"""
+Snapshot Cache Module
+Keeps a local month-partitioned Parquet copy of the billable data extract
+"""
+
+import json
+import os
+import pandas as pd
+import config
+import metrics
+from Data.data_sources import connect_to_sql, date_filter, get_billable_data, get_source
+
+
+def get_billable_data_cached(months=None):
+    """
+    Billable data for the given months, re-fetching only changed months
+    
+    Each month is stored as a Parquet partition next to the server-side
+    fingerprint it was fetched with. A month is pulled again only when its
+    fingerprint no longer matches.
+    
+    Args:
+        months: Optional list of months in YYYY-MM format; all months with
+            billable data when omitted
+    
+    Returns:
+        DataFrame with the get_billable_data columns
+    """
+    if not get_source().caches_snapshots:
+        return get_billable_data(months=months)
+    
+    fingerprints = month_fingerprints(months)
+    if months is None:
+        months = sorted(fingerprints)
+    
+    os.makedirs(config.SNAPSHOT_CACHE_DIR, exist_ok=True)
+    stale = [
+        month for month in months
+        if not _is_current(month, fingerprints.get(month))
+    ]
+    metrics.count('snapshot_months_hits', len(months) - len(stale))
+    metrics.count('snapshot_months_misses', len(stale))
+    
+    if stale:
+        fresh = get_billable_data(months=stale)
+        fresh_months = pd.to_datetime(fresh['Date']).dt.strftime('%Y-%m')
+        for month in stale:
+            fresh[fresh_months == month].to_parquet(_partition_path(month, 'parquet'), index=False)
+            # Fingerprint last: a partition only counts as cached once both files exist
+            with open(_partition_path(month, 'json'), 'w') as f:
+                json.dump(fingerprints.get(month), f)
+    
+    return pd.concat(
+        [pd.read_parquet(_partition_path(month, 'parquet')) for month in months],
+        ignore_index=True
+    )
+
+
+def month_fingerprints(months=None):
+    """
+    Cheap server-side fingerprint per month: row count, latest date and a
+    checksum over every extracted column
+    
+    Customer and employee names come from the dimension joins, so renaming
+    one in Harvest changes the checksum of every month it billed in.
+    BINARY_CHECKSUM is case-sensitive, unlike CHECKSUM under the usual
+    case-insensitive collation, so a change of case counts too.
+    
+    Args:
+        months: Optional list of months in YYYY-MM format
+    
+    Returns:
+        Dict of YYYY-MM -> fingerprint dict, only for months with billable data
+    """
+    predicate, params = date_filter(months=months)
+    query = f"""
+    SELECT
+        YEAR(f.Date) AS Year,
+        MONTH(f.Date) AS Month,
+        COUNT(*) AS RowCount,
+        MAX(f.Date) AS MaxDate,
+        CHECKSUM_AGG(BINARY_CHECKSUM(
+            c.CustomerName, e.EmployeeName, f.Date, f.Hours, f.BillableRate, f.BillableAmount
+        )) AS Checksum
+    FROM PowerBIData.FactTable_HARVEST_Actual f
+    JOIN PowerBIData.DimCustomer_Tabular_Flat c ON f.CustomerKey = c.CustomerKey
+    JOIN PowerBIData.DimEmployee_Tabular_Flat e ON f.EmployeeKey = e.EmployeeKey
+    WHERE f.IsBillableKey = 1{predicate}
+    GROUP BY YEAR(f.Date), MONTH(f.Date)
+    """
+    
+    conn = connect_to_sql()
+    df = pd.read_sql(query, conn, params=tuple(params))
+    conn.close()
+    
+    return {
+        f"{row.Year:04d}-{row.Month:02d}": {
+            'rows': int(row.RowCount),
+            'max_date': str(row.MaxDate),
+            'checksum': int(row.Checksum)
+        }
+        for row in df.itertuples()
+    }
+
+
+def _is_current(month, fingerprint):
+    """Whether a cached partition exists and was fetched with this fingerprint"""
+    if not (os.path.exists(_partition_path(month, 'parquet'))
+            and os.path.exists(_partition_path(month, 'json'))):
+        return False
+    with open(_partition_path(month, 'json')) as f:
+        return json.load(f) == fingerprint
+
+
+def _partition_path(month, extension):
+    return os.path.join(config.SNAPSHOT_CACHE_DIR, f"{month}.{extension}")
@@ -0,0 +1,112 @@
+"""
+Aggregation Module
+Summary metrics and a customer × employee × month × rank roll-up cube
+"""
+
+import numpy as np
+import pandas as pd
+from Workflow.reconciliation import discrepancy_mask
+
+
+# Cube dimensions and the additive measures kept per cell
+DIMENSIONS = ['customer', 'employee', 'month', 'rank']
+MEASURES = ['records', 'hours', 'amount_billed', 'expected_amount', 'discrepancy', 'discrepancy_records']
+
+
+class Aggregates:
+    """
+    Everything reports show besides the record listings, from one grouped pass
+    
+    Totals and per-dimension roll-ups are sums over the cube, which has one
+    row per customer, employee, month and rank that occurs in the results.
+    Cubes of chunks or months add up with combine().
+    """
+    
+    def __init__(self, cube, discrepancies=None):
+        """
+        Args:
+            cube: DataFrame with DIMENSIONS and MEASURES columns
+            discrepancies: Result rows over the discrepancy threshold, if kept
+        """
+        self.cube = cube
+        self.discrepancies = discrepancies
+    
+    @classmethod
+    def from_results(cls, results_df, keep_discrepancies=True):
+        """
+        Aggregate reconcile_data results
+        
+        Args:
+            results_df: DataFrame from reconcile_data (or a chunk of it)
+            keep_discrepancies: Also keep the discrepant rows themselves
+        
+        Returns:
+            Aggregates
+        """
+        is_discrepancy = discrepancy_mask(results_df).to_numpy()
+        frame = pd.DataFrame({
+            'customer': results_df['sql_customer'].to_numpy(),
+            'employee': results_df['sql_employee'].to_numpy(),
+            'month': _months(results_df['date']),
+            'rank': results_df['normalized_rank'].to_numpy(),
+            'hours': results_df['hours'].to_numpy(),
+            'amount_billed': results_df['amount_billed'].to_numpy(),
+            'expected_amount': results_df['expected_amount'].to_numpy(),
+            'discrepancy': results_df['discrepancy'].to_numpy(),
+            'discrepancy_records': is_discrepancy.astype(np.int64)
+        })
+        cube = frame.groupby(DIMENSIONS, dropna=False, observed=True, sort=False).agg(
+            records=('hours', 'size'),
+            hours=('hours', 'sum'),
+            amount_billed=('amount_billed', 'sum'),
+            expected_amount=('expected_amount', 'sum'),
+            discrepancy=('discrepancy', 'sum'),
+            discrepancy_records=('discrepancy_records', 'sum')
+        ).reset_index()
+        return cls(cube, results_df[is_discrepancy] if keep_discrepancies else None)
+    
+    @classmethod
+    def combine(cls, parts):
+        """
+        Add up the cubes of several chunks or months
+        
+        Discrepant rows are not carried over, so memory stays bounded by the cube.
+        
+        Returns:
+            Aggregates
+        """
+        cubes = [part.cube for part in parts if part is not None]
+        return cls(_regroup(pd.concat(cubes, ignore_index=True), DIMENSIONS))
+    
+    @property
+    def totals(self):
+        """Dict of records, amount_billed, expected_amount, discrepancy and discrepancy_records"""
+        return {
+            'records': int(self.cube['records'].sum()),
+            'amount_billed': self.cube['amount_billed'].sum(),
+            'expected_amount': self.cube['expected_amount'].sum(),
+            'discrepancy': self.cube['discrepancy'].sum(),
+            'discrepancy_records': int(self.cube['discrepancy_records'].sum())
+        }
+    
+    def rollup(self, *dimensions):
+        """
+        Cube summed down to the given dimensions
+        
+        Returns:
+            DataFrame with the dimensions and MEASURES columns
+        """
+        return _regroup(self.cube, list(dimensions))
+
+
+def _regroup(cube, dimensions):
+    """Sum cube measures by dimensions"""
+    return cube.groupby(dimensions, dropna=False, observed=True, sort=True)[MEASURES].sum().reset_index()
+
+
+def _months(dates):
+    """YYYY-MM per row, as a categorical of the distinct months in date order"""
+    codes, months = pd.factorize(
+        np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[M]'), sort=True, use_na_sentinel=False
+    )
+    return pd.Categorical.from_codes(codes, [str(month)[:7] for month in months])
@@ -0,0 +1,113 @@
+"""
+Alias Cache Module
+Persists fuzzy match results across runs so only new names are matched
+"""
+
+import hashlib
+import sqlite3
+import pandas as pd
+import config
+import metrics
+from Data.data_sources import file_sha256
+from Workflow.matching import resolve_employees, resolve_customers
+
+
+EMPLOYEE_COLUMNS = ['sql_employee', 'matched_employee', 'employee_title', 'employee_match_score']
+CUSTOMER_COLUMNS = ['sql_customer', 'customer_type', 'matched_customer', 'customer_match_score']
+
+
+def pricing_fingerprint(workbook_path):
+    """
+    Fingerprint of everything a cached match depends on
+    
+    Args:
+        workbook_path: Path to the pricing workbook
+    
+    Returns:
+        Hex digest of the workbook content and the match thresholds
+    """
+    digest = hashlib.sha256(file_sha256(workbook_path).encode())
+    digest.update(
+        f"{config.EMPLOYEE_MATCH_THRESHOLD}:{config.CUSTOMER_MATCH_THRESHOLD}".encode()
+    )
+    return digest.hexdigest()
+
+
+class AliasCache:
+    """
+    SQLite store mapping raw SQL names to their SharePoint match
+    
+    All aliases are dropped when the fingerprint differs from the one the
+    store was built with.
+    """
+    
+    def __init__(self, path, fingerprint):
+        """
+        Args:
+            path: SQLite file path
+            fingerprint: Value from pricing_fingerprint()
+        """
+        # Batch workers share the store; wait for each other's writes
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS employee_aliases (
+                sql_employee TEXT PRIMARY KEY,
+                matched_employee TEXT,
+                employee_title TEXT,
+                employee_match_score REAL
+            );
+            CREATE TABLE IF NOT EXISTS customer_aliases (
+                sql_customer TEXT PRIMARY KEY,
+                customer_type TEXT,
+                matched_customer TEXT,
+                customer_match_score REAL
+            );
+        """)
+        
+        stored = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'fingerprint'"
+        ).fetchone()
+        if stored is None or stored[0] != fingerprint:
+            with self.conn:
+                self.conn.execute("DELETE FROM employee_aliases")
+                self.conn.execute("DELETE FROM customer_aliases")
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (fingerprint,)
+                )
+    
+    def resolve_employees(self, sql_names, employees_df):
+        """resolve_employees, fuzzy matching only names not already in the store"""
+        return self._resolve(
+            'employee_aliases', EMPLOYEE_COLUMNS, sql_names,
+            lambda names: resolve_employees(names, employees_df)
+        )
+    
+    def resolve_customers(self, sql_customers, fcc_customers, regular_customers):
+        """resolve_customers, fuzzy matching only names not already in the store"""
+        return self._resolve(
+            'customer_aliases', CUSTOMER_COLUMNS, sql_customers,
+            lambda names: resolve_customers(names, fcc_customers, regular_customers)
+        )
+    
+    def close(self):
+        self.conn.close()
+    
+    def _resolve(self, table, columns, names, resolve):
+        """Serve cached aliases and store fresh matches for the rest"""
+        names = pd.Series(pd.unique(names))
+        cached = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {table}", self.conn)
+        cached = cached[cached[columns[0]].isin(names)]
+        
+        missing = names[~names.isin(cached[columns[0]])]
+        metrics.count(f'{table}_hits', len(cached))
+        metrics.count(f'{table}_misses', len(missing))
+        
+        fresh = resolve(missing)
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * len(columns))})",
+                fresh.astype(object).where(fresh.notna(), None).itertuples(index=False)
+            )
+        
+        return pd.concat([cached, fresh], ignore_index=True)
@@ -0,0 +1,146 @@
+"""
+Batch Module
+Reconciles a range of months in parallel, one worker process per month
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import config
+import metrics
+from Data.data_sources import reset_engine
+from Data.snapshot_cache import get_billable_data_cached
+from Workflow.aggregation import Aggregates
+from Workflow.alias_cache import AliasCache
+from Workflow.reconciliation import combine_unmatched, reconcile_data
+from Workflow.report import create_report, create_rollup_report
+
+
+# Set in each worker process by _init_worker
+_pricing = None
+_fingerprint = None
+
+
+def month_range(first, last):
+    """
+    Every month from first to last inclusive
+    
+    Args:
+        first: First month in YYYY-MM format
+        last: Last month in YYYY-MM format
+    
+    Returns:
+        List of months in YYYY-MM format
+    """
+    current = datetime.strptime(first, '%Y-%m').date()
+    end = datetime.strptime(last, '%Y-%m').date()
+    if end < current:
+        raise ValueError(f"Month range ends ({last}) before it starts ({first})")
+    
+    months = []
+    while current <= end:
+        months.append(current.strftime('%Y-%m'))
+        current = (current + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def run_batch(months, pricing, fingerprint, workers=None, extra_formats=(), run_metrics=None):
+    """
+    Reconcile each month in its own process and write per-month reports
+    plus a combined roll-up
+    
+    Pricing, rate card and match indexes are built once by the caller and
+    handed to every worker when it starts, not once per month.
+    
+    Args:
+        months: List of months in YYYY-MM format
+        pricing: Pricing loaded from the SharePoint workbook
+        fingerprint: Value from pricing_fingerprint() for the alias cache
+        workers: Number of worker processes; config.BATCH_WORKERS by default
+        extra_formats: Also write every sheet as 'csv' and/or 'parquet' files
+        run_metrics: Optional RunMetrics collecting each month's stage metrics
+    
+    Returns:
+        Tuple of (rollup_file, month_reports) where month_reports is a
+        dict of YYYY-MM -> report filename
+    """
+    # Reset a stale alias store once up front so workers don't race to clear it
+    AliasCache(config.ALIAS_CACHE_FILE, fingerprint).close()
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    with ProcessPoolExecutor(
+        max_workers=workers or config.BATCH_WORKERS,
+        initializer=_init_worker,
+        initargs=(pricing, fingerprint)
+    ) as pool:
+        futures = {
+            month: pool.submit(_reconcile_month, month, timestamp, extra_formats)
+            for month in months
+        }
+        results = {month: future.result() for month, future in futures.items()}
+    
+    unmatched_employees = combine_unmatched([result[2] for result in results.values()])
+    unmatched_customers = combine_unmatched([result[3] for result in results.values()])
+    if run_metrics is not None:
+        for month, (*_, month_metrics) in results.items():
+            run_metrics.add_child(month, month_metrics)
+        # Names unmatched in several months count once
+        metrics.counters['unmatched_employees'] = len(unmatched_employees)
+        metrics.counters['unmatched_customers'] = len(unmatched_customers)
+    
+    rollup_file = create_rollup_report(
+        Aggregates.combine([aggregates for _, aggregates, _, _, _ in results.values()]),
+        unmatched_employees, unmatched_customers, extra_formats,
+        output_file=f'billing_reconciliation_{months[0]}_{months[-1]}_{timestamp}_rollup.xlsx'
+    )
+    return rollup_file, {month: report for month, (report, *_) in results.items()}
+
+
+def _init_worker(pricing, fingerprint):
+    """Keep the shared pricing for this worker's months"""
+    global _pricing, _fingerprint
+    _pricing = pricing
+    _fingerprint = fingerprint
+    # Pooled connections must not be shared with the parent process
+    reset_engine()
+
+
+def _reconcile_month(month, timestamp, extra_formats):
+    """
+    Extract, reconcile and report a single month in a worker process
+    
+    Returns:
+        Tuple of (report filename, Aggregates without discrepant rows,
+        unmatched employees, unmatched customers, RunMetrics.to_dict())
+    """
+    month_metrics = metrics.RunMetrics()
+    
+    with month_metrics.stage('extract') as stage:
+        sql_df = get_billable_data_cached([month])
+        stage['rows'] = len(sql_df)
+    
+    with month_metrics.stage('reconcile') as stage:
+        alias_cache = AliasCache(config.ALIAS_CACHE_FILE, _fingerprint)
+        results_df, unmatched_employees, unmatched_customers = reconcile_data(
+            sql_df, _pricing, alias_cache
+        )
+        alias_cache.close()
+        stage['rows'] = len(results_df)
+    metrics.count('unmatched_employees', len(unmatched_employees))
+    metrics.count('unmatched_customers', len(unmatched_customers))
+    
+    with month_metrics.stage('aggregate') as stage:
+        aggregates = Aggregates.from_results(results_df)
+        stage['rows'] = len(results_df)
+    
+    with month_metrics.stage('report') as stage:
+        report = create_report(
+            results_df, unmatched_employees, unmatched_customers, extra_formats,
+            output_file=f'billing_reconciliation_{month}_{timestamp}.xlsx', aggregates=aggregates
+        )
+        stage['rows'] = len(results_df)
+    
+    # Only the cube goes back to the parent, not the discrepant rows
+    return (
+        report, Aggregates(aggregates.cube), unmatched_employees, unmatched_customers,
+        month_metrics.to_dict()
+    )
@@ -0,0 +1,258 @@
+"""
+Delta Module
+Keeps each run's reconciled rows so the next run only reconciles what changed
+"""
+
+import sqlite3
+import numpy as np
+import pandas as pd
+import metrics
+from Data.data_sources import month_ranges
+from Workflow.reconciliation import discrepancy_mask, reconcile_data, unmatched_from_rows
+
+
+# A fact row is identified by these; occurrence numbers rows that share the rest
+KEY_COLUMNS = ['date', 'sql_employee', 'sql_customer', 'hours', 'occurrence']
+
+# reconcile_data columns with their SQLite types
+RESULT_COLUMNS = {
+    'sql_customer': 'TEXT',
+    'sql_employee': 'TEXT',
+    'date': 'TEXT',
+    'hours': 'REAL',
+    'rate_charged': 'REAL',
+    'amount_billed': 'REAL',
+    'matched_employee': 'TEXT',
+    'employee_title': 'TEXT',
+    'employee_match_score': 'REAL',
+    'normalized_rank': 'TEXT',
+    'customer_type': 'TEXT',
+    'matched_customer': 'TEXT',
+    'customer_match_score': 'REAL',
+    'expected_rate': 'REAL',
+    'price_rank_used': 'TEXT',
+    'expected_amount': 'REAL',
+    'discrepancy': 'REAL',
+    'discrepancy_pct': 'REAL'
+}
+
+# Loaded column dtypes, so an empty load still merges with the fact keys
+LOAD_DTYPES = {
+    'row_id': np.int64,
+    **{name: np.float64 if kind == 'REAL' else object for name, kind in RESULT_COLUMNS.items()},
+    'occurrence': np.int64,
+    'pricing_version': np.int64
+}
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Columns shown for each discrepancy in the delta report
+DELTA_COLUMNS = [
+    'date', 'sql_customer', 'sql_employee', 'normalized_rank', 'hours', 'rate_charged',
+    'expected_rate', 'amount_billed', 'expected_amount', 'discrepancy', 'discrepancy_pct'
+]
+
+
+class ResultStore:
+    """
+    SQLite store of reconciled rows keyed by KEY_COLUMNS
+    
+    Each row remembers the pricing fingerprint it was reconciled with, so
+    rows priced with an older workbook or other thresholds are redone.
+    """
+    
+    def __init__(self, path, fingerprint):
+        """
+        Args:
+            path: SQLite file path
+            fingerprint: Value from pricing_fingerprint()
+        """
+        self.conn = sqlite3.connect(path, timeout=30)
+        columns = ', '.join(f"{name} {kind}" for name, kind in RESULT_COLUMNS.items())
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS pricing_versions (
+                version INTEGER PRIMARY KEY,
+                fingerprint TEXT UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                {columns},
+                occurrence INTEGER,
+                pricing_version INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS ix_results_date ON results (date);
+        """)
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO pricing_versions (fingerprint) VALUES (?)", (fingerprint,))
+        self.version = self.conn.execute(
+            "SELECT version FROM pricing_versions WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()[0]
+    
+    def load(self, months=None):
+        """
+        Stored rows, all or within the given months
+        
+        Returns:
+            DataFrame with RESULT_COLUMNS (date as text), occurrence,
+            pricing_version and row_id
+        """
+        query = f"SELECT rowid AS row_id, {', '.join(RESULT_COLUMNS)}, occurrence, pricing_version FROM results"
+        params = []
+        if months:
+            clauses = []
+            for start, end in month_ranges(months):
+                clauses.append("(date >= ? AND date < ?)")
+                params += [start.isoformat(), end.isoformat()]
+            query += f" WHERE {' OR '.join(clauses)}"
+        return pd.read_sql_query(query, self.conn, params=params).astype(LOAD_DTYPES)
+    
+    def update(self, stale_row_ids, fresh):
+        """
+        Replace stale rows with freshly reconciled ones in one transaction
+        
+        Args:
+            stale_row_ids: row_id values to delete
+            fresh: DataFrame with RESULT_COLUMNS (date as text) and occurrence
+        """
+        columns = [*RESULT_COLUMNS, 'occurrence']
+        rows = fresh[columns].astype(object).where(fresh[columns].notna(), None)
+        with self.conn:
+            self.conn.executemany("DELETE FROM results WHERE rowid = ?", [(int(i),) for i in stale_row_ids])
+            self.conn.executemany(
+                f"INSERT INTO results ({', '.join(columns)}, pricing_version) "
+                f"VALUES ({', '.join('?' * len(columns))}, ?)",
+                [(*row, self.version) for row in rows.itertuples(index=False, name=None)]
+            )
+    
+    def close(self):
+        self.conn.close()
+
+
+def reconcile_delta(sql_df, pricing, alias_cache, store, months=None):
+    """
+    Reconcile only fact rows that are new, changed or priced with other pricing
+    
+    Rows whose key, rate and amount match the stored result from the same
+    pricing fingerprint reuse it. Stored rows no longer in the extract are
+    dropped.
+    
+    Args:
+        sql_df: DataFrame with SQL billable data for the months
+        pricing: Pricing loaded from the SharePoint workbook
+        alias_cache: AliasCache used to resolve employee and customer names
+        store: ResultStore holding the previous run
+        months: Months the extract covers; None for all
+    
+    Returns:
+        Tuple of (results_df, delta, counts, unmatched_employees, unmatched_customers)
+        where results_df holds every current row, delta is a diff_discrepancies()
+        dict, counts has reused/reconciled/removed row counts and the unmatched
+        values are unmatched_counts() DataFrames
+    """
+    previous = store.load(months)
+    keys = pd.DataFrame({
+        'date': pd.to_datetime(sql_df['Date']).dt.strftime(DATE_FORMAT).to_numpy(),
+        'sql_employee': sql_df['EmployeeName'].to_numpy(dtype=object),
+        'sql_customer': sql_df['CustomerName'].to_numpy(dtype=object),
+        'hours': sql_df['Hours'].to_numpy(dtype=np.float64),
+        'rate_charged': sql_df['BillableRate'].to_numpy(dtype=np.float64),
+        'amount_billed': sql_df['BillableAmount'].to_numpy(dtype=np.float64)
+    })
+    keys['occurrence'] = _occurrence(keys)
+    
+    matched = keys.merge(
+        previous[[*KEY_COLUMNS, 'rate_charged', 'amount_billed', 'pricing_version', 'row_id']],
+        how='left', on=KEY_COLUMNS, suffixes=('', '_previous')
+    )
+    unchanged = (
+        (matched['pricing_version'] == store.version)
+        & _same(matched['rate_charged'], matched['rate_charged_previous'])
+        & _same(matched['amount_billed'], matched['amount_billed_previous'])
+    ).to_numpy()
+    
+    fresh = sql_df[~unchanged]
+    if len(fresh):
+        fresh_results, _, _ = reconcile_data(fresh, pricing, alias_cache)
+        fresh_results = fresh_results.astype({
+            column: object for column in fresh_results.columns
+            if isinstance(fresh_results[column].dtype, pd.CategoricalDtype)
+        })
+        fresh_results['date'] = keys['date'].to_numpy()[~unchanged]
+        fresh_results['occurrence'] = keys['occurrence'].to_numpy()[~unchanged]
+    else:
+        fresh_results = previous.iloc[:0].drop(columns=['row_id', 'pricing_version'])
+    
+    kept_ids = matched['row_id'].to_numpy()[unchanged]
+    is_kept = previous['row_id'].isin(kept_ids).to_numpy()
+    stale = previous[~is_kept]
+    store.update(stale['row_id'], fresh_results)
+    
+    current = pd.concat(
+        [previous[is_kept].drop(columns=['row_id', 'pricing_version']), fresh_results],
+        ignore_index=True
+    )
+    delta = diff_discrepancies(previous, current)
+    
+    counts = {
+        'reused': int(unchanged.sum()),
+        'reconciled': len(fresh_results),
+        # Stale rows were either redone (changed) or have left the extract
+        'removed': len(stale) - int(matched['row_id'].notna().to_numpy()[~unchanged].sum())
+    }
+    metrics.count('delta_rows_reused', counts['reused'])
+    metrics.count('delta_rows_reconciled', counts['reconciled'])
+    
+    current['date'] = pd.to_datetime(current['date'], format=DATE_FORMAT)
+    # Every name was resolved by this or an earlier run, so these are alias cache hits
+    employee_unmatched = current['matched_employee'].isna()
+    employee_scores = alias_cache.resolve_employees(
+        pd.Series(current.loc[employee_unmatched, 'sql_employee'].unique()), pricing.employees_df
+    ).set_index('sql_employee')['employee_match_score']
+    customer_unmatched = current['customer_type'].isna()
+    customer_scores = alias_cache.resolve_customers(
+        pd.Series(current.loc[customer_unmatched, 'sql_customer'].unique()),
+        pricing.fcc_customers, pricing.regular_customers
+    ).set_index('sql_customer')['customer_match_score']
+    unmatched_employees = unmatched_from_rows(current[employee_unmatched.to_numpy()], 'sql_employee', employee_scores)
+    unmatched_customers = unmatched_from_rows(current[customer_unmatched.to_numpy()], 'sql_customer', customer_scores)
+    return current, delta, counts, unmatched_employees, unmatched_customers
+
+
+def diff_discrepancies(previous, current, tolerance=0.005):
+    """
+    Compare the >1% discrepancies of two sets of reconciled rows by key
+    
+    Args:
+        previous: Stored rows from the previous run
+        current: Rows after this run
+        tolerance: Discrepancy change below which a row counts as unchanged
+    
+    Returns:
+        Dict of DataFrames: added (new discrepancies), resolved (no longer
+        discrepant or gone, with their previous values) and changed (still
+        discrepant with a different amount, with discrepancy_previous)
+    """
+    before = previous[discrepancy_mask(previous)]
+    after = current[discrepancy_mask(current)]
+    both = after[DELTA_COLUMNS + ['occurrence']].merge(
+        before[KEY_COLUMNS + ['discrepancy']], how='left', on=KEY_COLUMNS,
+        suffixes=('', '_previous'), indicator=True
+    )
+    was_discrepant = (both['_merge'] == 'both').to_numpy()
+    changed = both[was_discrepant & ~(abs(both['discrepancy'] - both['discrepancy_previous']) <= tolerance)]
+    
+    gone = before.merge(after[KEY_COLUMNS], how='left', on=KEY_COLUMNS, indicator=True)
+    return {
+        'added': both[~was_discrepant][DELTA_COLUMNS],
+        'resolved': gone[(gone['_merge'] == 'left_only').to_numpy()][DELTA_COLUMNS],
+        'changed': changed[DELTA_COLUMNS + ['discrepancy_previous']]
+    }
+
+
+def _occurrence(keys):
+    """Number rows that share date, employee, customer and hours, in extract order"""
+    return keys.groupby(KEY_COLUMNS[:-1], dropna=False, sort=False).cumcount().to_numpy()
+
+
+def _same(values, previous):
+    """Equal, or both missing"""
+    return (values == previous) | (values.isna() & previous.isna())
@@ -3,153 +3,383 @@ Matching Module
 Handles fuzzy matching for employees, customers, and title normalization
 """
 
-from fuzzywuzzy import fuzz, process
+import re
+from collections import Counter
+import numpy as np
 import pandas as pd
+from rapidfuzz import fuzz
+from rapidfuzz.process import cdist, cpdist
 import config
+import metrics
 
 
-def normalize_title(title):
+# Price fallback order: Principal → Senior → Consultant → Junior
+RANK_ORDER = [
+    'Principal Consultant',
+    'Senior Consultant',
+    'Consultant',
+    'Junior Consultant'
+]
+
+
+class TitleResolver:
     """
-    Normalize employee title to pricing rank
+    Maps free-text titles to ranks with one compiled pattern
+    
+    Every key of the title table found anywhere in the title is a
+    candidate. Seniority fragments outrank role fragments, so "Junior
+    Support" is priced as a junior; among equals the longest one wins
+    (earliest on ties), so "senior dev" beats "senior".
+    """
+    
+    def __init__(self, title_to_rank, seniority_keys, default='Consultant'):
+        """
+        Args:
+            title_to_rank: Dict of lower-case title fragment -> rank
+            seniority_keys: Keys of title_to_rank that name a seniority level
+            default: Rank for titles containing no known fragment
+        """
+        self.title_to_rank = title_to_rank
+        self.seniority_keys = seniority_keys
+        self.default = default
+        keys = sorted(title_to_rank, key=len, reverse=True)
+        # Lookahead so overlapping fragments are all seen, longest first at each position
+        self._pattern = re.compile(f"(?=({'|'.join(map(re.escape, keys))}))")
+    
+    def rank(self, title):
+        """Rank for a single title"""
+        matches = [match.group(1) for match in self._pattern.finditer(title.lower().strip())]
+        if not matches:
+            return self.default
+        best = max(matches, key=lambda key: (key in self.seniority_keys, len(key)))
+        return self.title_to_rank[best]
+    
+    def employee_ranks(self, employees_df):
+        """
+        Employee → rank table, first row wins for duplicate names as in matching
+        
+        Args:
+            employees_df: DataFrame with SharePoint employees
+        
+        Returns:
+            Dict of employee name -> rank
+        """
+        employees = employees_df.drop_duplicates('name')
+        return {name: self.rank(title) for name, title in zip(employees['name'], employees['title'])}
+
+
+def resolve_employees(sql_names, employees_df):
+    """
+    Match each distinct SQL employee name once
     
     Args:
-        title: Employee title from SharePoint
+        sql_names: Series of employee names from SQL (may repeat)
+        employees_df: DataFrame with SharePoint employees
     
     Returns:
-        Normalized rank (e.g., "Senior Consultant")
+        DataFrame with one row per distinct name: sql_employee,
+        matched_employee, employee_title, employee_match_score
+    """
+    names, best, scores = employee_candidates(sql_names, employees_df)
+    matched = scores >= config.EMPLOYEE_MATCH_THRESHOLD
+    
+    return pd.DataFrame({
+        'sql_employee': names,
+        'matched_employee': _pick(employees_df['name'].to_numpy(dtype=object), best, matched),
+        'employee_title': _pick(employees_df['title'].to_numpy(dtype=object), best, matched),
+        'employee_match_score': scores
+    })
+
+
+def employee_candidates(sql_names, employees_df):
     """
-    title_lower = title.lower().strip()
+    Best SharePoint employee for each distinct SQL employee name, before any threshold
+    
+    Args:
+        sql_names: Series of employee names from SQL (may repeat)
+        employees_df: DataFrame with SharePoint employees
     
-    # Direct match first
-    if title_lower in config.TITLE_TO_RANK:
-        return config.TITLE_TO_RANK[title_lower]
+    Returns:
+        Tuple of (distinct names, best employees_df position array, best score array)
+    """
+    names = pd.unique(sql_names)
     
-    # Partial matching for complex titles
-    for key, rank in config.TITLE_TO_RANK.items():
-        if key in title_lower:
-            return rank
+    # Extract just the name part (after the dash and initials) and
+    # remove dots from initials for better matching
+    queries = [
+        (name.split(' - ', 1)[1] if ' - ' in name else name).strip().replace('.', '')
+        for name in names
+    ]
     
-    # Default to Consultant if no match
-    return "Consultant"
+    best, scores = extract_best(queries, employees_df['name'].tolist(), 'token_sort_ratio')
+    return names, best, scores
 
 
-def match_employee(sql_name, employees_df):
+def customer_choices(regular_df, fcc_df):
     """
-    Match SQL employee name to SharePoint employee using fuzzy matching
+    Customer names to match against, indexed once per pricing load
     
-    Handles formats like:
-    - SQL: "SKA - Sam K. Andersen"
-    - SharePoint: "Sam K- Andersen"
+    Args:
+        regular_df: DataFrame with regular customer pricing
+        fcc_df: DataFrame with FCC customer pricing
+    
+    Returns:
+        Tuple of (fcc_customers, regular_customers) CustomerIndex objects
+        over the upper-cased customer names
+    """
+    return (
+        CustomerIndex(fcc_df['customer'].str.strip().str.upper().tolist()),
+        CustomerIndex(regular_df['customer'].str.strip().str.upper().tolist())
+    )
+
+
+def resolve_customers(sql_customers, fcc_customers, regular_customers):
+    """
+    Match each distinct SQL customer name once, trying FCC customers first
     
     Args:
-        sql_name: Employee name from SQL (with initials)
-        employees_df: DataFrame with SharePoint employees
+        sql_customers: Series of customer names from SQL (may repeat)
+        fcc_customers: CustomerIndex over the FCC customer names
+        regular_customers: CustomerIndex over the regular customer names
     
     Returns:
-        Tuple of (matched_name, title, match_score)
+        DataFrame with one row per distinct name: sql_customer,
+        customer_type, matched_customer, customer_match_score
     """
-    # Extract just the name part (after the dash and initials)
-    if ' - ' in sql_name:
-        name_part = sql_name.split(' - ', 1)[1].strip()
-    else:
-        name_part = sql_name.strip()
+    names, (fcc_best, fcc_scores), (regular_best, regular_scores) = customer_candidates(
+        sql_customers, fcc_customers, regular_customers
+    )
     
-    # Remove dots from initials for better matching
-    name_normalized = name_part.replace('.', '')
+    is_fcc = fcc_scores >= config.CUSTOMER_MATCH_THRESHOLD
+    is_regular = ~is_fcc & (regular_scores >= config.CUSTOMER_MATCH_THRESHOLD)
     
-    # Find best match
-    sharepoint_names = employees_df['name'].tolist()
+    return pd.DataFrame({
+        'sql_customer': names,
+        'customer_type': np.select([is_fcc, is_regular], ['FCC', 'Regular'], None),
+        'matched_customer': np.where(
+            is_fcc,
+            _pick(np.array(fcc_customers.names, dtype=object), fcc_best, is_fcc),
+            _pick(np.array(regular_customers.names, dtype=object), regular_best, is_regular)
+        ),
+        'customer_match_score': np.where(is_fcc, fcc_scores, regular_scores)
+    })
+
+
+def customer_candidates(sql_customers, fcc_customers, regular_customers):
+    """
+    Best FCC and best regular customer for each distinct SQL customer name, before any threshold
     
-    if not sharepoint_names:
-        return None, None, 0
+    Args:
+        sql_customers: Series of customer names from SQL (may repeat)
+        fcc_customers: CustomerIndex over the FCC customer names
+        regular_customers: CustomerIndex over the regular customer names
     
-    match, score = process.extractOne(
-        name_normalized,
-        sharepoint_names,
-        scorer=fuzz.token_sort_ratio
+    Returns:
+        Tuple of (distinct names, (FCC best, FCC scores), (regular best, regular scores))
+        where best values are positions in the customer lists
+    """
+    names = pd.unique(sql_customers)
+    queries = [name.strip().upper() for name in names]
+    return (
+        names,
+        fcc_customers.extract_best(queries),
+        regular_customers.extract_best(queries)
     )
+
+
+class CustomerIndex:
+    """
+    Character bigram index for exact best-match search over customer names
     
-    if score >= config.EMPLOYEE_MATCH_THRESHOLD:
-        matched_row = employees_df[employees_df['name'] == match].iloc[0]
-        return matched_row['name'], matched_row['title'], score
+    A common subsequence of length L leaves at least na - 2(la - L) - (lb - L)
+    of the na bigrams of a intact in b, so two names sharing s bigrams have
+    L <= (s + la + lb + 1) // 3 and a ratio score of at most 200 L / (la + lb).
+    Each query scores its most promising name first and then only the names
+    whose bound can still match or beat that score, so the result is the one
+    a full scan gives. At the pricing sheet's size a query close to one name
+    scores about two names; one that matches nothing well scores all of them.
+    """
     
-    return None, None, score
+    def __init__(self, names):
+        """
+        Args:
+            names: List of upper-cased customer names
+        """
+        self.names = names
+        self._processed = np.array([_full_process(name) for name in names], dtype=object)
+        self._lengths = np.array([len(name) for name in self._processed], dtype=np.int64)
+        
+        postings = {}
+        for i, name in enumerate(self._processed):
+            for gram, count in _bigrams(name).items():
+                postings.setdefault(gram, []).append((i, count))
+        # Postings of bigram id g are entries _starts[g]:_starts[g + 1]
+        self._gram_ids = {gram: g for g, gram in enumerate(postings)}
+        entries = [entry for gram_entries in postings.values() for entry in gram_entries]
+        self._posting_names = np.array([i for i, _ in entries], dtype=np.int64)
+        self._posting_counts = np.array([count for _, count in entries], dtype=np.int64)
+        self._starts = np.cumsum([0, *map(len, postings.values())])
+    
+    def extract_best(self, queries):
+        """
+        extract_best(queries, names, 'ratio') without scoring every name
+        
+        Returns:
+            Tuple of (best name index array, best score array); all scores
+            are 0 when there are no names
+        """
+        best = np.zeros(len(queries), dtype=np.int64)
+        scores = np.zeros(len(queries), dtype=np.int64)
+        if not self.names:
+            return best, scores
+        
+        processed = np.array([_full_process(query) for query in queries], dtype=object)
+        # A block of queries at a time keeps the bound matrix near a million cells
+        block = max(1, 2 ** 20 // len(self.names))
+        for start in range(0, len(queries), block):
+            rows = slice(start, start + block)
+            best[rows], scores[rows] = self._extract_block(processed[rows])
+        return best, scores
+    
+    def _extract_block(self, processed):
+        bound = self._bounds(processed)
+        
+        # Score the most promising name, then every name that could still match or beat it
+        top = _ratios(processed, self._processed[bound.argmax(axis=1)])
+        query_ids, name_ids = np.nonzero(bound >= (top - 0.5 - 1e-9)[:, None])
+        candidate_scores = _ratios(processed[query_ids], self._processed[name_ids])
+        metrics.count('fuzzy_comparisons', len(processed) + len(query_ids))
+        
+        # Highest score per query, earliest name on ties
+        order = np.lexsort((name_ids, -candidate_scores, query_ids))
+        winners = order[np.flatnonzero(np.diff(query_ids[order], prepend=-1))]
+        return name_ids[winners], candidate_scores[winners]
+    
+    def _bounds(self, processed):
+        """Upper bound of the ratio score of each query against every name"""
+        query_ids, gram_ids, query_counts = [], [], []
+        for i, query in enumerate(processed):
+            for gram, count in _bigrams(query).items():
+                if gram in self._gram_ids:
+                    query_ids.append(i)
+                    gram_ids.append(self._gram_ids[gram])
+                    query_counts.append(count)
+        
+        # Expand each query bigram into its postings and add up the shared counts
+        gram_ids = np.array(gram_ids, dtype=np.int64)
+        starts = self._starts[gram_ids]
+        sizes = self._starts[gram_ids + 1] - starts
+        entries = np.arange(sizes.sum()) + np.repeat(starts - np.cumsum(sizes) + sizes, sizes)
+        shared = np.bincount(
+            np.repeat(np.array(query_ids, dtype=np.int64), sizes) * len(self.names) + self._posting_names[entries],
+            weights=np.minimum(self._posting_counts[entries], np.repeat(query_counts, sizes)),
+            minlength=len(processed) * len(self.names)
+        ).reshape(len(processed), len(self.names))
+        
+        query_lengths = np.array([len(query) for query in processed], dtype=np.int64)[:, None]
+        total = self._lengths + query_lengths
+        longest_common = np.minimum(np.minimum(self._lengths, query_lengths), (shared + total + 1) // 3)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, 200 * longest_common / total, 100.0)
 
 
-def match_customer(sql_customer, regular_df, fcc_df):
+def extract_best(queries, choices, scorer):
     """
-    Match SQL customer name to SharePoint customer using fuzzy matching
+    Score every query against every choice and keep the best match per query
+    
+    Mirrors fuzzywuzzy's process.extractOne (default processing, integer
+    scores, first choice wins ties) on top of rapidfuzz's C scorer.
     
     Args:
-        sql_customer: Customer name from SQL
-        regular_df: DataFrame with regular customer pricing
-        fcc_df: DataFrame with FCC customer pricing
+        queries: List of query strings
+        choices: List of candidate strings
+        scorer: 'token_sort_ratio' or 'ratio'
     
     Returns:
-        Tuple of (customer_type, matched_name, match_score)
-        customer_type is either 'FCC', 'Regular', or None
-    """
-    sql_customer_clean = sql_customer.strip().upper()
-    
-    # Try FCC customers first
-    fcc_customers = fcc_df['customer'].str.strip().str.upper().tolist()
-    if fcc_customers:
-        match, score = process.extractOne(
-            sql_customer_clean,
-            fcc_customers,
-            scorer=fuzz.ratio
-        )
-        if score >= config.CUSTOMER_MATCH_THRESHOLD:
-            return 'FCC', match, score
-    
-    # Try regular customers
-    regular_customers = regular_df['customer'].str.strip().str.upper().tolist()
-    
-    if not regular_customers:
-        return None, None, 0
-    
-    match, score = process.extractOne(
-        sql_customer_clean,
-        regular_customers,
-        scorer=fuzz.ratio
-    )
+        Tuple of (best choice index array, best score array); all scores
+        are 0 when there are no choices
+    """
+    if not choices:
+        return np.zeros(len(queries), dtype=np.int64), np.zeros(len(queries), dtype=np.int64)
     
-    if score >= config.CUSTOMER_MATCH_THRESHOLD:
-        return 'Regular', match, score
+    metrics.count('fuzzy_comparisons', len(queries) * len(choices))
+    process_query, process_choice = _PROCESSORS[scorer]
+    scores = np.round(cdist(
+        [process_query(query) for query in queries],
+        [process_choice(choice) for choice in choices],
+        scorer=fuzz.ratio,
+        dtype=np.float64,
+        workers=config.MATCH_WORKERS
+    )).astype(np.int64)
     
-    return None, None, score
+    best = scores.argmax(axis=1)
+    return best, scores[np.arange(len(queries)), best]
 
 
-def get_price_with_fallback(pricing_row, rank):
+def _pick(values, index, mask):
+    """values[index] where mask is set, None elsewhere"""
+    picked = np.full(len(index), None, dtype=object)
+    picked[mask] = values[index[mask]]
+    return picked
+
+
+def _ratios(queries, choices):
+    """Rounded ratio score of each query against the choice at the same position"""
+    return np.round(cpdist(
+        list(queries), list(choices), scorer=fuzz.ratio, dtype=np.float64, workers=config.MATCH_WORKERS
+    )).astype(np.int64)
+
+
+def _bigrams(s):
+    """Bigram counts of a processed string"""
+    return Counter(s[i:i + 2] for i in range(len(s) - 1))
+
+
+def _full_process(s):
+    """Keep only letters and numbers, lower-case and trim (fuzzywuzzy's full_process)"""
+    return _NON_WORD.sub(' ', s).lower().strip()
+
+
+def _token_sort_process(s):
     """
-    Get price for rank, falling back to next available rank if 0 or missing
+    Drop Latin-1 characters, full_process and sort tokens (fuzzywuzzy's token_sort_ratio)
+    
+    Latin-1 characters go first, so a no-break space or ® joins the words
+    around it rather than splitting them.
+    """
+    return ' '.join(sorted(_full_process(s.translate(_LATIN1)).split()))
+
+
+_NON_WORD = re.compile(r"(?ui)\W")
+_LATIN1 = {i: None for i in range(128, 256)}
+# (query, choice) processing per scorer; extractOne runs full_process on
+# the query before token_sort_ratio processes both sides again
+_PROCESSORS = {
+    'token_sort_ratio': (lambda s: _token_sort_process(_full_process(s)), _token_sort_process),
+    'ratio': (_full_process, _full_process)
+}
+
+
+def get_prices_with_fallback(prices, ranks):
+    """
+    Get price per row for its rank, falling back to the next available rank if 0 or missing
     
     Fallback order: Principal → Senior → Consultant → Junior
     
     Args:
-        pricing_row: Row from pricing DataFrame
-        rank: Requested rank (e.g., "Senior Consultant")
+        prices: Array of shape (n, 4) with prices in RANK_ORDER column order
+        ranks: Array of n requested ranks (e.g., "Senior Consultant")
     
     Returns:
-        Tuple of (price, rank_used)
+        Tuple of (price array, rank_used array); NaN/None where no price is found
     """
-    rank_order = [
-        'Principal Consultant',
-        'Senior Consultant',
-        'Consultant',
-        'Junior Consultant'
-    ]
-    
-    # Start from requested rank
-    if rank in rank_order:
-        start_idx = rank_order.index(rank)
-    else:
-        start_idx = 2  # Default to Consultant
+    # Ranks outside the fallback chain start from Consultant
+    start = pd.Series(ranks).map({rank: i for i, rank in enumerate(RANK_ORDER)}).fillna(2)
     
-    for check_rank in rank_order[start_idx:]:
-        if check_rank in pricing_row:
-            price = pricing_row[check_rank]
-            if pd.notna(price) and price > 0:
-                return price, check_rank
+    available = (prices > 0) & (np.arange(len(RANK_ORDER)) >= start.to_numpy()[:, None])
+    found = available.any(axis=1)
+    first = available.argmax(axis=1)
     
-    return None, None
\ No newline at end of file
+    price = np.where(found, prices[np.arange(len(prices)), first], np.nan)
+    rank_used = np.where(found, np.array(RANK_ORDER, dtype=object)[first], None)
+    return price, rank_used
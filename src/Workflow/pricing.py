@@ -0,0 +1,34 @@
+"""
+Pricing Module
+Parsed pricing tables bundled with the structures derived from them
+"""
+
+import config
+from Workflow.matching import TitleResolver, customer_choices
+from Workflow.rate_card import RateCard
+
+
+class Pricing:
+    """
+    Everything reconciliation needs from the pricing workbook
+    
+    The rate card, customer match lists and employee ranks are built once
+    when the workbook is loaded, so every month, chunk or worker process
+    reuses them.
+    """
+    
+    def __init__(self, employees_df, regular_df, fcc_df):
+        """
+        Args:
+            employees_df: DataFrame with SharePoint employees
+            regular_df: DataFrame with regular customer pricing
+            fcc_df: DataFrame with FCC customer pricing
+        """
+        self.employees_df = employees_df
+        self.regular_df = regular_df
+        self.fcc_df = fcc_df
+        self.rate_card = RateCard.from_pricing(regular_df, fcc_df)
+        self.fcc_customers, self.regular_customers = customer_choices(regular_df, fcc_df)
+        self.employee_ranks = TitleResolver(
+            config.TITLE_TO_RANK, config.SENIORITY_TITLE_KEYS
+        ).employee_ranks(employees_df)
@@ -0,0 +1,137 @@
+"""
+Rate Card Module
+Precomputed expected hourly rate per customer and rank
+"""
+
+import numpy as np
+import pandas as pd
+import config
+from Workflow.matching import RANK_ORDER, get_prices_with_fallback
+
+
+# Every rank an employee title can normalize to
+RANKS = list(dict.fromkeys(config.TITLE_TO_RANK.values()))
+
+
+class RateCard:
+    """
+    Dense customer × rank matrix of expected rates
+    
+    Customers are keyed by (customer_type, matched_customer) as returned by
+    resolve_customers. FCC flat pricing and the zero/NaN rank fallback are
+    applied when the card is built, so pricing a row is two integer lookups.
+    """
+    
+    def __init__(self, customers, rates, ranks_used):
+        """
+        Args:
+            customers: List of (customer_type, customer_name) tuples, one per matrix row
+            rates: Float array (customers × RANKS) of expected rates, NaN where unpriced
+            ranks_used: Object array (customers × RANKS) of the rank each price came from
+        """
+        self.customers = customers
+        self.rates = rates
+        self.ranks_used = ranks_used
+        self._customer_ids = {customer: i for i, customer in enumerate(customers)}
+        self._rank_ids = {rank: i for i, rank in enumerate(RANKS)}
+    
+    @classmethod
+    def from_pricing(cls, regular_df, fcc_df):
+        """
+        Build the rate card from parse_sharepoint_file output
+        
+        Args:
+            regular_df: DataFrame with regular customer pricing
+            fcc_df: DataFrame with FCC customer pricing
+        
+        Returns:
+            RateCard
+        """
+        fcc = _pricing_by_customer(fcc_df)
+        regular = _pricing_by_customer(regular_df)
+        
+        # FCC uses Consultant price for all ranks
+        fcc_rates = np.repeat(
+            pd.to_numeric(fcc['Consultant'], errors='coerce').to_numpy()[:, None], len(RANKS), axis=1
+        )
+        fcc_ranks_used = np.full(fcc_rates.shape, 'Consultant (FCC)', dtype=object)
+        
+        # Regular customers - price for each rank with fallback
+        prices = regular[RANK_ORDER].apply(pd.to_numeric, errors='coerce').to_numpy()
+        regular_rates = np.full((len(regular), len(RANKS)), np.nan)
+        regular_ranks_used = np.empty((len(regular), len(RANKS)), dtype=object)
+        for j, rank in enumerate(RANKS):
+            price, rank_used = get_prices_with_fallback(prices, np.full(len(regular), rank))
+            regular_rates[:, j] = price
+            regular_ranks_used[:, j] = np.where(pd.isna(rank_used), rank, rank_used)
+        
+        customers = (
+            [('FCC', name) for name in fcc.index]
+            + [('Regular', name) for name in regular.index]
+        )
+        return cls(
+            customers,
+            np.vstack([fcc_rates, regular_rates]),
+            np.vstack([fcc_ranks_used, regular_ranks_used])
+        )
+    
+    def customer_ids(self, customer_types, customer_names):
+        """Map matched (customer_type, customer_name) pairs to row ids, -1 if unmatched"""
+        return np.array([
+            self._customer_ids.get((customer_type, name), -1)
+            for customer_type, name in zip(customer_types, customer_names)
+        ], dtype=np.int64)
+    
+    def rank_ids(self, ranks):
+        """Map normalized ranks to column ids"""
+        return np.array([self._rank_ids[rank] for rank in ranks], dtype=np.int64)
+    
+    def lookup(self, customer_ids, rank_ids):
+        """
+        Price rows by customer id and rank id
+        
+        Returns:
+            Tuple of (expected_rate array, price_rank_used array); NaN/None for customer id -1
+        """
+        matched = customer_ids >= 0
+        expected_rate = np.where(matched, self.rates[customer_ids, rank_ids], np.nan)
+        price_rank_used = np.where(matched, self.ranks_used[customer_ids, rank_ids], None)
+        return expected_rate, price_rank_used
+    
+    def to_frame(self):
+        """Long-format table: one row per customer and rank"""
+        customer_types, names = zip(*self.customers) if self.customers else ((), ())
+        return pd.DataFrame({
+            'customer_type': np.repeat(customer_types, len(RANKS)),
+            'customer': np.repeat(names, len(RANKS)),
+            'rank': np.tile(RANKS, len(self.customers)),
+            'expected_rate': self.rates.ravel(),
+            'price_rank_used': self.ranks_used.ravel()
+        })
+    
+    def save(self, path):
+        """Export the rate card as CSV so other tools can price hours directly"""
+        self.to_frame().to_csv(path, index=False)
+        return path
+    
+    @classmethod
+    def load(cls, path):
+        """Load a rate card exported with save() or --export-rate-card"""
+        # The default float parser can change the last bit of a saved rate
+        table = pd.read_csv(path, float_precision='round_trip')
+        customers = list(dict.fromkeys(zip(table['customer_type'], table['customer'])))
+        shape = (len(customers), len(RANKS))
+        ranks = table['rank'].drop_duplicates().tolist()
+        if ranks != RANKS:
+            raise ValueError(f"Rate card ranks {ranks} do not match configured ranks {RANKS}")
+        return cls(
+            customers,
+            table['expected_rate'].to_numpy(dtype=float).reshape(shape),
+            table['price_rank_used'].to_numpy(dtype=object).reshape(shape)
+        )
+
+
+def _pricing_by_customer(pricing_df):
+    """Index pricing rows by normalized customer name, first row wins on duplicates"""
+    key = pricing_df['customer'].str.strip().str.upper()
+    return pricing_df.set_index(key)[~key.duplicated().to_numpy()]
@@ -3,110 +3,178 @@ Reconciliation Module
 Performs the actual reconciliation between SQL data and SharePoint pricing
 """
 
+import numpy as np
 import pandas as pd
-from Workflow.matching import match_employee, match_customer, normalize_title, get_price_with_fallback
 
 
-def reconcile_data(sql_df, employees_df, regular_df, fcc_df):
+# Entries billed more than this many percent off the expected amount are discrepancies
+DISCREPANCY_THRESHOLD_PCT = 1
+
+
+def reconcile_data(sql_df, pricing, alias_cache):
     """
     Reconcile SQL billable data against SharePoint pricing
     
+    Name, title and rank columns are categoricals and match scores float32,
+    so repeated strings are stored once per distinct value.
+    
     Args:
         sql_df: DataFrame with SQL billable data
-        employees_df: DataFrame with SharePoint employees
-        regular_df: DataFrame with regular customer pricing
-        fcc_df: DataFrame with FCC customer pricing
+        pricing: Pricing loaded from the SharePoint workbook
+        alias_cache: AliasCache used to resolve employee and customer names
     
     Returns:
-        Tuple of (results_df, unmatched_employees, unmatched_customers)
+        Tuple of (results_df, unmatched_employees, unmatched_customers) where
+        the unmatched values are unmatched_counts() DataFrames
+    """
+    hours = sql_df['Hours'].to_numpy()
+    amount_billed = sql_df['BillableAmount'].to_numpy()
+    
+    # Fuzzy match each distinct name once, then spread the matches over rows by code
+    employee_codes, employee_names = pd.factorize(sql_df['EmployeeName'], use_na_sentinel=False)
+    employees = _by_name(
+        alias_cache.resolve_employees(pd.Series(employee_names), pricing.employees_df),
+        'sql_employee', employee_names
+    )
+    employees['normalized_rank'] = employees['matched_employee'].map(
+        pricing.employee_ranks
+    ).fillna('Consultant')  # Default fallback
+    customer_codes, customer_names = pd.factorize(sql_df['CustomerName'], use_na_sentinel=False)
+    customers = _by_name(
+        alias_cache.resolve_customers(
+            pd.Series(customer_names), pricing.fcc_customers, pricing.regular_customers
+        ),
+        'sql_customer', customer_names
+    )
+    
+    emp_matched = employees['matched_employee'].notna().to_numpy()
+    cust_matched = customers['customer_type'].notna().to_numpy()
+    unmatched_employees = unmatched_counts(
+        employee_names, employees['employee_match_score'], ~emp_matched,
+        employee_codes, hours, amount_billed
+    )
+    unmatched_customers = unmatched_counts(
+        customer_names, customers['customer_match_score'], ~cust_matched,
+        customer_codes, hours, amount_billed
+    )
+    
+    rate_card = pricing.rate_card
+    expected_rate, price_rank_used = rate_card.lookup(
+        rate_card.customer_ids(customers['customer_type'], customers['matched_customer'])[customer_codes],
+        rate_card.rank_ids(employees['normalized_rank'])[employee_codes]
+    )
+    
+    results = pd.DataFrame({
+        'sql_customer': pd.Categorical.from_codes(customer_codes, customer_names),
+        'sql_employee': pd.Categorical.from_codes(employee_codes, employee_names),
+        'date': sql_df['Date'].to_numpy(),
+        'hours': hours,
+        'rate_charged': sql_df['BillableRate'].to_numpy(),
+        'amount_billed': amount_billed,
+        'matched_employee': _spread(employees['matched_employee'], employee_codes),
+        'employee_title': _spread(employees['employee_title'], employee_codes),
+        # Scores are only reported for successful matches
+        'employee_match_score': np.where(
+            emp_matched, employees['employee_match_score'], np.nan
+        ).astype(np.float32)[employee_codes],
+        'normalized_rank': _spread(employees['normalized_rank'], employee_codes),
+        'customer_type': _spread(customers['customer_type'], customer_codes),
+        'matched_customer': _spread(customers['matched_customer'], customer_codes),
+        'customer_match_score': np.where(
+            cust_matched, customers['customer_match_score'], np.nan
+        ).astype(np.float32)[customer_codes],
+        'expected_rate': expected_rate,
+        'price_rank_used': pd.Categorical(price_rank_used)
+    })
+    
+    # Calculate discrepancy; no or zero expected rate means nothing to compare
+    has_rate = results['expected_rate'].notna() & (results['expected_rate'] != 0)
+    results['expected_amount'] = (results['hours'] * results['expected_rate']).where(has_rate)
+    results['discrepancy'] = results['amount_billed'] - results['expected_amount']
+    results['discrepancy_pct'] = (
+        results['discrepancy'] / results['expected_amount'] * 100
+    ).where(results['expected_amount'] != 0, 0).where(has_rate)
+    
+    return results, unmatched_employees, unmatched_customers
+
+
+def unmatched_counts(names, scores, unmatched, codes, hours, amount_billed):
     """
-    results = []
-    unmatched_employees = []
-    unmatched_customers = []
+    Per-name counter of rows whose name found no match
     
-    for idx, row in sql_df.iterrows():
-        result = {
-            'sql_customer': row['CustomerName'],
-            'sql_employee': row['EmployeeName'],
-            'date': row['Date'],
-            'hours': row['Hours'],
-            'rate_charged': row['BillableRate'],
-            'amount_billed': row['BillableAmount']
-        }
-        
-        # Match employee
-        sp_employee, sp_title, emp_score = match_employee(
-            row['EmployeeName'],
-            employees_df
-        )
-        
-        if sp_employee:
-            result['matched_employee'] = sp_employee
-            result['employee_title'] = sp_title
-            result['employee_match_score'] = emp_score
-            
-            # Normalize title to rank
-            normalized_rank = normalize_title(sp_title)
-            result['normalized_rank'] = normalized_rank
-        else:
-            unmatched_employees.append((row['EmployeeName'], emp_score))
-            result['matched_employee'] = None
-            result['employee_title'] = None
-            result['normalized_rank'] = 'Consultant'  # Default fallback
-        
-        # Match customer
-        customer_type, sp_customer, cust_score = match_customer(
-            row['CustomerName'],
-            regular_df,
-            fcc_df
-        )
-        
-        if customer_type:
-            result['customer_type'] = customer_type
-            result['matched_customer'] = sp_customer
-            result['customer_match_score'] = cust_score
-            
-            # Get pricing
-            if customer_type == 'FCC':
-                # FCC uses Consultant price for all ranks
-                pricing_row = fcc_df[
-                    fcc_df['customer'].str.strip().str.upper() == sp_customer
-                ].iloc[0]
-                expected_rate = pricing_row['Consultant']
-                result['expected_rate'] = expected_rate
-                result['price_rank_used'] = 'Consultant (FCC)'
-            else:
-                # Regular customer - get price for rank with fallback
-                pricing_row = regular_df[
-                    regular_df['customer'].str.strip().str.upper() == sp_customer
-                ].iloc[0]
-                expected_rate, rank_used = get_price_with_fallback(
-                    pricing_row,
-                    result['normalized_rank']
-                )
-                result['expected_rate'] = expected_rate
-                result['price_rank_used'] = rank_used or result['normalized_rank']
-        else:
-            unmatched_customers.append((row['CustomerName'], cust_score))
-            result['matched_customer'] = None
-            result['expected_rate'] = None
-        
-        # Calculate discrepancy
-        if result['expected_rate']:
-            result['expected_amount'] = result['hours'] * result['expected_rate']
-            result['discrepancy'] = result['amount_billed'] - result['expected_amount']
-            
-            if result['expected_amount'] != 0:
-                result['discrepancy_pct'] = (
-                    result['discrepancy'] / result['expected_amount'] * 100
-                )
-            else:
-                result['discrepancy_pct'] = 0
-        else:
-            result['expected_amount'] = None
-            result['discrepancy'] = None
-            result['discrepancy_pct'] = None
-        
-        results.append(result)
+    Args:
+        names: Distinct names
+        scores: Best match score per distinct name
+        unmatched: Boolean mask over names
+        codes: Per-row index into names
+        hours: Per-row hours
+        amount_billed: Per-row billed amount
     
-    return pd.DataFrame(results), unmatched_employees, unmatched_customers
\ No newline at end of file
+    Returns:
+        DataFrame with columns name, match_score, occurrences, hours and
+        amount_at_risk (billed amount that could not be checked)
+    """
+    return pd.DataFrame({
+        'name': np.asarray(names, dtype=object),
+        'match_score': np.asarray(scores, dtype=np.float64),
+        'occurrences': np.bincount(codes, minlength=len(names)),
+        'hours': np.bincount(codes, weights=hours, minlength=len(names)),
+        'amount_at_risk': np.bincount(codes, weights=amount_billed, minlength=len(names))
+    })[np.asarray(unmatched)].reset_index(drop=True)
+
+
+def combine_unmatched(frames):
+    """
+    Add up unmatched_counts() frames from several chunks or months
+    
+    Returns:
+        unmatched_counts() DataFrame with one row per name
+    """
+    combined = pd.concat(frames, ignore_index=True)
+    return combined.groupby('name', as_index=False, sort=False).agg({
+        'match_score': 'first',
+        'occurrences': 'sum',
+        'hours': 'sum',
+        'amount_at_risk': 'sum'
+    })
+
+
+def unmatched_from_rows(rows, name_column, scores):
+    """
+    unmatched_counts() frame rebuilt from the reconciled rows of unmatched names
+    
+    Args:
+        rows: reconcile_data rows whose name in name_column found no match
+        name_column: 'sql_employee' or 'sql_customer'
+        scores: Series of best match score indexed by name
+    
+    Returns:
+        unmatched_counts() DataFrame with one row per name
+    """
+    grouped = rows.groupby(name_column, dropna=False, observed=True, sort=False).agg(
+        occurrences=('hours', 'size'), hours=('hours', 'sum'), amount_at_risk=('amount_billed', 'sum')
+    ).reset_index()
+    names = grouped[name_column].to_numpy(dtype=object)
+    return pd.DataFrame({
+        'name': names,
+        'match_score': scores[~scores.index.duplicated()].reindex(names).to_numpy(dtype=np.float64),
+        'occurrences': grouped['occurrences'].to_numpy(dtype=np.int64),
+        'hours': grouped['hours'].to_numpy(dtype=np.float64),
+        'amount_at_risk': grouped['amount_at_risk'].to_numpy(dtype=np.float64)
+    })
+
+
+def _by_name(resolved, key, names):
+    """Resolved matches in the order of the distinct names"""
+    return resolved.drop_duplicates(key).set_index(key).reindex(names).reset_index(drop=True)
+
+
+def _spread(values, codes):
+    """Categorical per-row column from one value per distinct name"""
+    categorical = pd.Categorical(values)
+    return pd.Categorical.from_codes(categorical.codes[codes], dtype=categorical.dtype)
+
+
+def discrepancy_mask(results_df):
+    """Rows whose discrepancy exceeds DISCREPANCY_THRESHOLD_PCT"""
+    return abs(results_df['discrepancy_pct']) > DISCREPANCY_THRESHOLD_PCT
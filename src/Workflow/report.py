@@ -4,55 +4,189 @@ Generates Excel reports with reconciliation results
 """
 
 import pandas as pd
-import openpyxl
-from openpyxl.styles import PatternFill
+import xlsxwriter
+from xlsxwriter.utility import xl_range
 from datetime import datetime
+from Workflow.aggregation import Aggregates
 
 
-def create_report(results_df, unmatched_employees, unmatched_customers):
+# Rows converted to cell values at a time while streaming a sheet
+WRITE_CHUNK_ROWS = 10_000
+
+# Roll-up cube dimensions and their column headers
+DIMENSION_LABELS = {'customer': 'Customer', 'employee': 'Employee', 'month': 'Month', 'rank': 'Rank'}
+
+
+def create_report(results_df, unmatched_employees, unmatched_customers, extra_formats=(),
+                  output_file=None, aggregates=None):
     """
     Generate Excel report with reconciliation results
     
     Args:
         results_df: DataFrame with reconciliation results
-        unmatched_employees: List of tuples (employee_name, match_score)
-        unmatched_customers: List of tuples (customer_name, match_score)
+        unmatched_employees: unmatched_counts() DataFrame of employee names
+        unmatched_customers: unmatched_counts() DataFrame of customer names
+        extra_formats: Also write every sheet as 'csv' and/or 'parquet' files
+        output_file: Report filename; timestamped by default
+        aggregates: Aggregates of results_df with discrepancies kept; computed when omitted
     
     Returns:
         Filename of generated report
     """
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_file = f'billing_reconciliation_{timestamp}.xlsx'
+    if aggregates is None:
+        aggregates = Aggregates.from_results(results_df)
     
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        
-        # Summary sheet
-        _create_summary_sheet(writer, results_df, unmatched_employees, unmatched_customers)
-        
-        # Discrepancies sheet
-        _create_discrepancies_sheet(writer, results_df)
-        
-        # All records sheet
-        _create_all_records_sheet(writer, results_df)
-        
-        # Unmatched employees sheet
-        if unmatched_employees:
-            _create_unmatched_employees_sheet(writer, unmatched_employees)
-        
-        # Unmatched customers sheet
-        if unmatched_customers:
-            _create_unmatched_customers_sheet(writer, unmatched_customers)
+    sheets = _run_sheets(aggregates, unmatched_employees, unmatched_customers, {
+        'Discrepancies': _discrepancies_frame(aggregates.discrepancies),
+        'All Records': _all_records_frame(results_df)
+    })
+    return _write_report('', sheets, extra_formats, output_file)
+
+
+def create_rollup_report(aggregates, unmatched_employees, unmatched_customers,
+                         extra_formats=(), output_file=None):
+    """
+    Generate Excel roll-up for runs that keep no records in the report:
+    streaming runs, whose records went to CSV, and month ranges
+    
+    Args:
+        aggregates: Aggregates combined over all chunks or months
+        unmatched_employees: unmatched_counts() DataFrame of employee names
+        unmatched_customers: unmatched_counts() DataFrame of customer names
+        extra_formats: Also write every sheet as 'csv' and/or 'parquet' files
+        output_file: Report filename; timestamped by default
+    
+    Returns:
+        Filename of generated report
+    """
+    sheets = _run_sheets(aggregates, unmatched_employees, unmatched_customers, {})
+    return _write_report('_rollup', sheets, extra_formats, output_file)
+
+
+def create_server_report(aggregates, unmatched_employees, unmatched_customers, extra_formats=()):
+    """
+    Generate Excel report for a server-side reconciliation
+    
+    Args:
+        aggregates: Aggregates from reconcile_on_server, with its discrepant rows
+        unmatched_employees: unmatched_counts() DataFrame of employee names
+        unmatched_customers: unmatched_counts() DataFrame of customer names
+        extra_formats: Also write every sheet as 'csv' and/or 'parquet' files
+    
+    Returns:
+        Filename of generated report
+    """
+    sheets = _run_sheets(aggregates, unmatched_employees, unmatched_customers, {
+        'Discrepancies': _discrepancies_frame(aggregates.discrepancies)
+    })
+    return _write_report('_server', sheets, extra_formats)
+
+
+def create_delta_report(delta, aggregates, counts, unmatched_employees, unmatched_customers,
+                        extra_formats=()):
+    """
+    Generate Excel report of what changed since the previous run
+    
+    Args:
+        delta: Dict of added/resolved/changed discrepancy DataFrames from reconcile_delta
+        aggregates: Aggregates over all current records
+        counts: Dict of reused/reconciled/removed record counts
+        unmatched_employees: unmatched_counts() DataFrame of employee names
+        unmatched_customers: unmatched_counts() DataFrame of customer names
+        extra_formats: Also write every sheet as 'csv' and/or 'parquet' files
+    
+    Returns:
+        Filename of generated report
+    """
+    delta_summary = pd.DataFrame({
+        'Metric': [
+            'Records Reused from Previous Run',
+            'Records Reconciled (New or Changed)',
+            'Records Removed',
+            'Discrepancies Added',
+            'Discrepancies Resolved',
+            'Discrepancies Changed'
+        ],
+        'Value': [
+            counts['reused'],
+            counts['reconciled'],
+            counts['removed'],
+            len(delta['added']),
+            len(delta['resolved']),
+            len(delta['changed'])
+        ]
+    }, dtype=object)
+    
+    sheets = _run_sheets(aggregates, unmatched_employees, unmatched_customers, {
+        'Added Discrepancies': _delta_frame(delta['added']),
+        'Resolved Discrepancies': _delta_frame(delta['resolved']),
+        'Changed Discrepancies': _delta_frame(delta['changed'])
+    }, extra_summary=delta_summary)
+    return _write_report('_delta', sheets, extra_formats)
+
+
+def create_what_if_report(sweep_df, extra_formats=()):
+    """
+    Generate Excel table of match outcomes per threshold pair
+    
+    Args:
+        sweep_df: DataFrame from threshold_sweep
+        extra_formats: Also write every sheet as 'csv' and/or 'parquet' files
+    
+    Returns:
+        Filename of generated report
+    """
+    return _write_report('_what_if', {'Thresholds': _what_if_frame(sweep_df)}, extra_formats)
+
+
+def _write_report(suffix, sheets, extra_formats, output_file=None):
+    """
+    Write sheets to output_file, billing_reconciliation_<timestamp><suffix>.xlsx
+    by default, and to every extra format
+    
+    Returns:
+        Filename of generated report
+    """
+    if output_file is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_file = f'billing_reconciliation_{timestamp}{suffix}.xlsx'
+    
+    _write_workbook(output_file, sheets)
+    _write_extra_formats(output_file, sheets, extra_formats)
     
     return output_file
 
 
-def _create_summary_sheet(writer, results_df, unmatched_employees, unmatched_customers):
-    """Create summary sheet with overall statistics"""
-    total_billed = results_df['amount_billed'].sum()
-    total_expected = results_df['expected_amount'].sum()
-    total_discrepancy = results_df['discrepancy'].sum()
+def _run_sheets(aggregates, unmatched_employees, unmatched_customers, own_sheets, extra_summary=None):
+    """
+    Sheets of a reconciliation run: Summary, the mode's own sheets, the
+    roll-ups and any unmatched names
     
-    summary = pd.DataFrame({
+    Args:
+        aggregates: Aggregates of the run
+        unmatched_employees: unmatched_counts() DataFrame of employee names
+        unmatched_customers: unmatched_counts() DataFrame of customer names
+        own_sheets: Dict of sheet name -> DataFrame only this mode writes
+        extra_summary: Metric/Value rows appended to the Summary sheet
+    
+    Returns:
+        Dict of sheet name -> DataFrame in workbook order
+    """
+    summary = _summary_frame(aggregates.totals, unmatched_employees, unmatched_customers)
+    if extra_summary is not None:
+        summary = pd.concat([summary, extra_summary], ignore_index=True)
+    
+    sheets = {'Summary': summary, **own_sheets, **_rollup_frames(aggregates)}
+    if len(unmatched_employees):
+        sheets['Unmatched Employees'] = _unmatched_frame(unmatched_employees, 'Employee')
+    if len(unmatched_customers):
+        sheets['Unmatched Customers'] = _unmatched_frame(unmatched_customers, 'Customer')
+    return sheets
+
+
+def _summary_frame(totals, unmatched_employees, unmatched_customers):
+    """Overall statistics"""
+    return pd.DataFrame({
         'Metric': [
             'Total Records',
             'Total Amount Billed',
@@ -63,73 +197,159 @@ def _create_summary_sheet(writer, results_df, unmatched_employees, unmatched_cus
             'Unmatched Customers'
         ],
         'Value': [
-            len(results_df),
-            f"{total_billed:,.2f}",
-            f"{total_expected:,.2f}",
-            f"{total_discrepancy:,.2f}",
-            len(results_df[abs(results_df['discrepancy_pct']) > 1]),
-            len(set(unmatched_employees)),
-            len(set(unmatched_customers))
+            totals['records'],
+            float(totals['amount_billed']),
+            float(totals['expected_amount']),
+            float(totals['discrepancy']),
+            totals['discrepancy_records'],
+            len(unmatched_employees),
+            len(unmatched_customers)
         ]
+    }, dtype=object)
+
+
+def _rollup_frames(aggregates):
+    """Compact roll-up sheets from the aggregation cube"""
+    return {
+        'By Customer': _totals_frame(aggregates.rollup('customer'), DIMENSION_LABELS),
+        'By Employee': _totals_frame(aggregates.rollup('employee'), DIMENSION_LABELS),
+        'By Month': _totals_frame(aggregates.rollup('month'), DIMENSION_LABELS, by_discrepancy=False),
+        'By Rank': _totals_frame(aggregates.rollup('rank'), DIMENSION_LABELS),
+        'Roll-up Cube': _totals_frame(
+            aggregates.rollup(*DIMENSION_LABELS), DIMENSION_LABELS, by_discrepancy=False
+        )
+    }
+
+
+def _totals_frame(totals, labels, by_discrepancy=True):
+    """Totals with report headers, largest absolute discrepancy first unless by_discrepancy is False"""
+    frame = totals.rename(columns={
+        **labels,
+        'records': 'Records',
+        'hours': 'Hours',
+        'amount_billed': 'Amount Billed',
+        'expected_amount': 'Expected Amount',
+        'discrepancy': 'Discrepancy',
+        'discrepancy_records': 'Records with Discrepancies (>1%)'
     })
-    summary.to_excel(writer, sheet_name='Summary', index=False)
+    if by_discrepancy:
+        frame = frame.sort_values('Discrepancy', key=abs, ascending=False)
+    return frame
 
 
-def _create_discrepancies_sheet(writer, results_df):
-    """Create sheet with only discrepant records"""
-    discrepancies = results_df[abs(results_df['discrepancy_pct']) > 1].copy()
-    
+def _what_if_frame(sweep_df):
+    """Threshold sweep with report headers"""
+    return sweep_df.rename(columns={
+        'employee_threshold': 'Employee Threshold',
+        'customer_threshold': 'Customer Threshold',
+        'matched_employees': 'Matched Employees',
+        'unmatched_employees': 'Unmatched Employees',
+        'employee_amount_at_risk': 'Employee Amount at Risk',
+        'matched_customers': 'Matched Customers',
+        'unmatched_customers': 'Unmatched Customers',
+        'customer_amount_at_risk': 'Customer Amount at Risk',
+        'expected_amount': 'Expected Amount',
+        'discrepancy': 'Discrepancy',
+        'discrepancy_records': 'Records with Discrepancies (>1%)'
+    })
+
+
+def _discrepancies_frame(discrepancies):
+    """Discrepant records, largest discrepancy first"""
     if len(discrepancies) == 0:
-        # Create empty sheet with message
-        pd.DataFrame({
+        return pd.DataFrame({
             'Message': ['No discrepancies found (all within 1%)']
-        }).to_excel(writer, sheet_name='Discrepancies', index=False)
-        return
+        })
     
-    disc_output = discrepancies[[
+    return discrepancies[[
         'sql_customer', 'sql_employee', 'employee_title', 'normalized_rank',
         'hours', 'rate_charged', 'expected_rate', 'amount_billed',
         'expected_amount', 'discrepancy', 'discrepancy_pct'
     ]].sort_values('discrepancy', key=abs, ascending=False)
-    
-    disc_output.to_excel(writer, sheet_name='Discrepancies', index=False)
-    
-    # Highlight discrepancies in red
-    worksheet = writer.sheets['Discrepancies']
-    red_fill = PatternFill(start_color='FFB6C1', end_color='FFB6C1', fill_type='solid')
-    
-    for row_idx in range(2, len(disc_output) + 2):
-        worksheet[f'J{row_idx}'].fill = red_fill  # discrepancy column
-        worksheet[f'K{row_idx}'].fill = red_fill  # discrepancy_pct column
 
 
-def _create_all_records_sheet(writer, results_df):
-    """Create sheet with all records"""
-    all_output = results_df[[
+def _delta_frame(discrepancies):
+    """Discrepancies by date, or a note when there are none"""
+    if len(discrepancies) == 0:
+        return pd.DataFrame({'Message': ['None since the previous run']})
+    return discrepancies.sort_values('date')
+
+
+def _all_records_frame(results_df):
+    """All records by date"""
+    return results_df[[
         'date', 'sql_customer', 'sql_employee', 'employee_title',
         'normalized_rank', 'price_rank_used', 'hours', 'rate_charged',
         'expected_rate', 'amount_billed', 'expected_amount',
         'discrepancy', 'discrepancy_pct'
     ]].sort_values('date')
-    
-    all_output.to_excel(writer, sheet_name='All Records', index=False)
 
 
-def _create_unmatched_employees_sheet(writer, unmatched_employees):
-    """Create sheet with unmatched employees"""
-    unmatched_emp_df = pd.DataFrame(
-        list(set(unmatched_employees)),
-        columns=['Employee', 'Match Score']
-    ).sort_values('Match Score')
+def _unmatched_frame(unmatched, label):
+    """Unmatched names with their usage, worst match first"""
+    return unmatched.rename(columns={
+        'name': label,
+        'match_score': 'Match Score',
+        'occurrences': 'Occurrences',
+        'hours': 'Hours',
+        'amount_at_risk': 'Amount at Risk'
+    }).sort_values(['Match Score', 'Amount at Risk'], ascending=[True, False])
+
+
+def _write_workbook(output_file, sheets):
+    """Stream sheets to an xlsx file in constant-memory mode"""
+    workbook = xlsxwriter.Workbook(output_file, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd',
+        'strings_to_formulas': False,
+        'strings_to_urls': False
+    })
     
-    unmatched_emp_df.to_excel(writer, sheet_name='Unmatched Employees', index=False)
+    for name, frame in sheets.items():
+        if name == 'Summary':
+            # Amounts shown with thousands separators, as text
+            frame = frame.assign(Value=[
+                f"{value:,.2f}" if isinstance(value, float) else value for value in frame['Value']
+            ])
+        worksheet = _write_sheet(workbook, name, frame)
+        
+        if name == 'Discrepancies' and 'discrepancy' in frame.columns:
+            # Highlight discrepancy and discrepancy_pct columns in red
+            red_fill = workbook.add_format({'bg_color': '#FFB6C1', 'pattern': 1})
+            first_col = frame.columns.get_loc('discrepancy')
+            last_col = frame.columns.get_loc('discrepancy_pct')
+            worksheet.conditional_format(
+                xl_range(1, first_col, len(frame), last_col),
+                {'type': 'no_blanks', 'format': red_fill}
+            )
+    
+    workbook.close()
 
 
-def _create_unmatched_customers_sheet(writer, unmatched_customers):
-    """Create sheet with unmatched customers"""
-    unmatched_cust_df = pd.DataFrame(
-        list(set(unmatched_customers)),
-        columns=['Customer', 'Match Score']
-    ).sort_values('Match Score')
+def _write_sheet(workbook, name, frame):
+    """Write header and rows in order so constant-memory mode can flush them"""
+    worksheet = workbook.add_worksheet(name)
+    worksheet.write_row(0, 0, list(frame.columns))
+    
+    for start in range(0, len(frame), WRITE_CHUNK_ROWS):
+        chunk = frame.iloc[start:start + WRITE_CHUNK_ROWS]
+        values = chunk.to_numpy(dtype=object, copy=True)
+        values[chunk.isna().to_numpy()] = None
+        for offset, row in enumerate(values):
+            worksheet.write_row(start + offset + 1, 0, row)
     
-    unmatched_cust_df.to_excel(writer, sheet_name='Unmatched Customers', index=False)
\ No newline at end of file
+    return worksheet
+
+
+def _write_extra_formats(output_file, sheets, extra_formats):
+    """Write each sheet as <report>_<sheet>.csv / .parquet for downstream tooling"""
+    base = output_file[:-len('.xlsx')]
+    for extra_format in extra_formats:
+        for name, frame in sheets.items():
+            path = f"{base}_{name.lower().replace(' ', '_')}.{extra_format}"
+            if extra_format == 'csv':
+                frame.to_csv(path, index=False)
+            elif extra_format == 'parquet':
+                frame.to_parquet(path, index=False)
+            else:
+                raise ValueError(f"Unsupported report format: {extra_format}")
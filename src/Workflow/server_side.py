@@ -0,0 +1,239 @@
+"""
+Server-Side Reconciliation Module
+Prices billable rows inside the database so only discrepancies and totals come back
+"""
+
+import numpy as np
+import pandas as pd
+import metrics
+from Data.data_sources import connect_to_sql, date_filter, get_source, load_temp_table
+from Workflow.aggregation import DIMENSIONS, MEASURES, Aggregates
+from Workflow.reconciliation import DISCREPANCY_THRESHOLD_PCT, combine_unmatched
+
+
+# Distinct employee/customer keys and names in the filtered extract
+KEYS_QUERY = """
+    SELECT DISTINCT
+        f.EmployeeKey,
+        e.EmployeeName,
+        f.CustomerKey,
+        c.CustomerName
+    FROM PowerBIData.FactTable_HARVEST_Actual f
+    JOIN PowerBIData.DimCustomer_Tabular_Flat c ON f.CustomerKey = c.CustomerKey
+    JOIN PowerBIData.DimEmployee_Tabular_Flat e ON f.EmployeeKey = e.EmployeeKey
+    WHERE f.IsBillableKey = 1{predicate}
+"""
+
+# Every billable row with its expected amount, discrepancy and discrepancy %,
+# computed the way reconcile_data does. The key tables only hold keys seen by
+# KEYS_QUERY, so joining them keeps the dimension inner joins' row set.
+PRICED_QUERY = """
+    SELECT
+        p.*,
+        p.amount_billed - p.expected_amount AS discrepancy,
+        CASE WHEN p.expected_amount = 0 THEN 0
+             ELSE (p.amount_billed - p.expected_amount) / p.expected_amount * 100
+        END AS discrepancy_pct
+    FROM (
+        SELECT
+            f.Date,
+            f.EmployeeKey,
+            f.CustomerKey,
+            CAST(f.Hours AS FLOAT) AS hours,
+            CAST(f.BillableRate AS FLOAT) AS rate_charged,
+            CAST(f.BillableAmount AS FLOAT) AS amount_billed,
+            r.expected_rate,
+            CAST(f.Hours AS FLOAT) * r.expected_rate AS expected_amount
+        FROM PowerBIData.FactTable_HARVEST_Actual f
+        JOIN {employees} em ON em.EmployeeKey = f.EmployeeKey
+        JOIN {customers} cm ON cm.CustomerKey = f.CustomerKey
+        LEFT JOIN {rates} r ON r.customer_id = cm.customer_id AND r.rank_id = em.rank_id
+        WHERE f.IsBillableKey = 1{predicate}
+    ) p
+"""
+
+
+def reconcile_on_server(pricing, alias_cache, start=None, end=None, months=None,
+                        threshold_pct=DISCREPANCY_THRESHOLD_PCT):
+    """
+    Reconcile billable data in the database instead of in pandas
+    
+    Names are still resolved here, once per distinct key. The resolved
+    employee ranks, customer ids and the priced cells of the rate card are
+    bulk-loaded into session temp tables, and set-based queries return only
+    rows over the threshold plus customer × employee × month totals.
+    
+    Args:
+        pricing: Pricing loaded from the SharePoint workbook
+        alias_cache: AliasCache used to resolve employee and customer names
+        start, end, months: Date filter, see get_billable_data
+        threshold_pct: Discrepancy % a row must exceed to be returned
+    
+    Returns:
+        Tuple of (aggregates, unmatched_employees, unmatched_customers) where
+        aggregates is Aggregates with the discrepant rows in reconcile_data
+        columns and the unmatched values are unmatched_counts() DataFrames
+    """
+    predicate, params = date_filter(start, end, months)
+    conn = connect_to_sql()
+    try:
+        keys = pd.read_sql(KEYS_QUERY.format(predicate=predicate), conn, params=tuple(params))
+        employees = _resolve_employee_keys(keys, pricing, alias_cache)
+        customers = _resolve_customer_keys(keys, pricing, alias_cache)
+        
+        rate_card = pricing.rate_card
+        customer_ids, rank_ids = np.nonzero(~np.isnan(rate_card.rates) & (rate_card.rates != 0))
+        tables = {
+            'employees': load_temp_table(
+                conn, 'recon_employees', ['EmployeeKey INT', 'rank_id INT'],
+                list(zip(employees.index.tolist(), employees['rank_id'].tolist()))
+            ),
+            'customers': load_temp_table(
+                conn, 'recon_customers', ['CustomerKey INT', 'customer_id INT'],
+                list(zip(customers.index.tolist(), customers['customer_id'].tolist()))
+            ),
+            'rates': load_temp_table(
+                conn, 'recon_rates', ['customer_id INT', 'rank_id INT', 'expected_rate FLOAT'],
+                list(zip(
+                    customer_ids.tolist(), rank_ids.tolist(),
+                    rate_card.rates[customer_ids, rank_ids].tolist()
+                ))
+            )
+        }
+        
+        priced = PRICED_QUERY.format(predicate=predicate, **tables)
+        month = get_source().month_of('c.Date')
+        flagged = pd.read_sql(
+            f"SELECT * FROM ({priced}) c WHERE ABS(c.discrepancy_pct) > ?",
+            conn, params=(*params, threshold_pct)
+        )
+        pairs = pd.read_sql(
+            f"""
+            SELECT
+                c.CustomerKey,
+                c.EmployeeKey,
+                {month} AS month,
+                COUNT(*) AS records,
+                SUM(c.hours) AS hours,
+                SUM(c.amount_billed) AS amount_billed,
+                SUM(c.expected_amount) AS expected_amount,
+                SUM(c.discrepancy) AS discrepancy,
+                SUM(CASE WHEN ABS(c.discrepancy_pct) > ? THEN 1 ELSE 0 END) AS discrepancy_records
+            FROM ({priced}) c
+            GROUP BY c.CustomerKey, c.EmployeeKey, {month}
+            """,
+            conn, params=(threshold_pct, *params)
+        )
+    finally:
+        conn.close()
+    
+    metrics.count('server_side_rows_returned', len(flagged) + len(pairs))
+    
+    pairs[MEASURES] = pairs[MEASURES].fillna(0)
+    cube = pd.DataFrame({
+        'customer': customers['sql_customer'].reindex(pairs['CustomerKey']).to_numpy(),
+        'employee': employees['sql_employee'].reindex(pairs['EmployeeKey']).to_numpy(),
+        'month': pairs['month'].to_numpy(),
+        'rank': employees['normalized_rank'].reindex(pairs['EmployeeKey']).to_numpy(),
+        **{measure: pairs[measure].to_numpy() for measure in MEASURES}
+    })
+    # Keys sharing a name fall into one cell, as they do in reconcile_data results
+    aggregates = Aggregates(
+        cube.groupby(DIMENSIONS, dropna=False, sort=False)[MEASURES].sum().reset_index(),
+        _discrepancies(flagged, employees, customers, rate_card)
+    )
+    unmatched_employees = _unmatched(
+        _aggregate(pairs, 'EmployeeKey', employees, ['sql_employee']),
+        employees, 'sql_employee', 'employee_match_score', employees['matched_employee'].isna()
+    )
+    unmatched_customers = _unmatched(
+        _aggregate(pairs, 'CustomerKey', customers, ['sql_customer']),
+        customers, 'sql_customer', 'customer_match_score', customers['customer_type'].isna()
+    )
+    
+    return aggregates, unmatched_employees, unmatched_customers
+
+
+def _resolve_employee_keys(keys, pricing, alias_cache):
+    """Match and rank per EmployeeKey"""
+    employees = keys[['EmployeeKey', 'EmployeeName']].drop_duplicates('EmployeeKey')
+    resolved = alias_cache.resolve_employees(
+        pd.Series(employees['EmployeeName'].unique()), pricing.employees_df
+    ).drop_duplicates('sql_employee')
+    employees = employees.merge(
+        resolved, how='left', left_on='EmployeeName', right_on='sql_employee'
+    ).set_index('EmployeeKey')
+    employees['sql_employee'] = employees['EmployeeName']
+    employees['normalized_rank'] = employees['matched_employee'].map(
+        pricing.employee_ranks
+    ).fillna('Consultant')  # Default fallback
+    employees['rank_id'] = pricing.rate_card.rank_ids(employees['normalized_rank'])
+    return employees.drop(columns='EmployeeName')
+
+
+def _resolve_customer_keys(keys, pricing, alias_cache):
+    """Match and rate card row per CustomerKey, customer_id -1 when unmatched"""
+    customers = keys[['CustomerKey', 'CustomerName']].drop_duplicates('CustomerKey')
+    resolved = alias_cache.resolve_customers(
+        pd.Series(customers['CustomerName'].unique()), pricing.fcc_customers, pricing.regular_customers
+    ).drop_duplicates('sql_customer')
+    customers = customers.merge(
+        resolved, how='left', left_on='CustomerName', right_on='sql_customer'
+    ).set_index('CustomerKey')
+    customers['sql_customer'] = customers['CustomerName']
+    customers['customer_id'] = pricing.rate_card.customer_ids(
+        customers['customer_type'], customers['matched_customer']
+    )
+    return customers.drop(columns='CustomerName')
+
+
+def _discrepancies(flagged, employees, customers, rate_card):
+    """Flagged rows with the names, matches and ranks reconcile_data reports"""
+    employee = employees.reindex(flagged['EmployeeKey'])
+    customer = customers.reindex(flagged['CustomerKey'])
+    emp_matched = employee['matched_employee'].notna().to_numpy()
+    _, price_rank_used = rate_card.lookup(
+        customer['customer_id'].to_numpy(), employee['rank_id'].to_numpy()
+    )
+    return pd.DataFrame({
+        'sql_customer': customer['sql_customer'].to_numpy(),
+        'sql_employee': employee['sql_employee'].to_numpy(),
+        'date': pd.to_datetime(flagged['Date']).to_numpy(),
+        'hours': flagged['hours'].to_numpy(),
+        'rate_charged': flagged['rate_charged'].to_numpy(),
+        'amount_billed': flagged['amount_billed'].to_numpy(),
+        'matched_employee': employee['matched_employee'].to_numpy(),
+        'employee_title': employee['employee_title'].to_numpy(),
+        'employee_match_score': np.where(
+            emp_matched, employee['employee_match_score'], np.nan
+        ).astype(np.float32),
+        'normalized_rank': employee['normalized_rank'].to_numpy(),
+        'customer_type': customer['customer_type'].to_numpy(),
+        'matched_customer': customer['matched_customer'].to_numpy(),
+        'customer_match_score': customer['customer_match_score'].to_numpy(dtype=np.float32),
+        'expected_rate': flagged['expected_rate'].to_numpy(),
+        'price_rank_used': price_rank_used,
+        'expected_amount': flagged['expected_amount'].to_numpy(),
+        'discrepancy': flagged['discrepancy'].to_numpy(),
+        'discrepancy_pct': flagged['discrepancy_pct'].to_numpy()
+    })
+
+
+def _aggregate(pairs, key, resolved, columns):
+    """Customer × employee × month totals summed per customer or per employee key"""
+    totals = pairs.groupby(key)[MEASURES].sum()
+    return resolved[columns].join(totals, how='inner').rename_axis('key').reset_index()
+
+
+def _unmatched(aggregate, resolved, name, score, unmatched):
+    """unmatched_counts() frame from per-key totals, combined per name"""
+    keys = resolved.index[unmatched.to_numpy()]
+    rows = aggregate[aggregate['key'].isin(keys)]
+    frame = pd.DataFrame({
+        'name': rows[name].to_numpy(dtype=object),
+        'match_score': resolved[score].reindex(rows['key']).to_numpy(dtype=np.float64),
+        'occurrences': rows['records'].to_numpy(),
+        'hours': rows['hours'].to_numpy(),
+        'amount_at_risk': rows['amount_billed'].to_numpy()
+    })
+    return combine_unmatched([frame])
@@ -0,0 +1,47 @@
+"""
+Streaming Module
+Reconciles billable data chunk by chunk with bounded memory
+"""
+
+from datetime import datetime
+from Workflow.aggregation import Aggregates
+from Workflow.reconciliation import combine_unmatched, reconcile_data
+
+
+def reconcile_stream(chunks, pricing, alias_cache):
+    """
+    Reconcile SQL data chunks and append the results to a CSV file
+    
+    Only the roll-up cube and unmatched-name counters are kept in memory.
+    
+    Args:
+        chunks: Iterable of SQL billable data DataFrames
+        pricing: Pricing loaded from the SharePoint workbook
+        alias_cache: AliasCache used to resolve employee and customer names
+    
+    Returns:
+        Tuple of (records_file, aggregates, unmatched_employees, unmatched_customers)
+        where aggregates is Aggregates without discrepant rows and the
+        unmatched values are unmatched_counts() DataFrames over all chunks
+    """
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    records_file = f'billing_reconciliation_{timestamp}_records.csv'
+    
+    aggregates = None
+    unmatched_employees = None
+    unmatched_customers = None
+    
+    for chunk in chunks:
+        results_df, chunk_employees, chunk_customers = reconcile_data(chunk, pricing, alias_cache)
+        results_df.to_csv(records_file, mode='a', header=aggregates is None, index=False)
+        
+        aggregates = Aggregates.combine([
+            aggregates, Aggregates.from_results(results_df, keep_discrepancies=False)
+        ])
+        unmatched_employees = combine_unmatched([unmatched_employees, chunk_employees])
+        unmatched_customers = combine_unmatched([unmatched_customers, chunk_customers])
+    
+    if aggregates is None:
+        raise ValueError("No billable data to reconcile")
+    
+    return records_file, aggregates, unmatched_employees, unmatched_customers
@@ -0,0 +1,128 @@
+"""
+What-If Module
+Sweeps match thresholds over match scores computed once
+"""
+
+import numpy as np
+import pandas as pd
+from Workflow.matching import customer_candidates, employee_candidates
+from Workflow.reconciliation import DISCREPANCY_THRESHOLD_PCT
+
+
+class MatchCandidates:
+    """
+    Best candidate and score per distinct SQL name, independent of the thresholds
+    
+    Matching keeps the single best choice from each pricing list and then
+    only compares its score with the threshold, so the best employee and the
+    best FCC and regular customer per name decide the outcome for every
+    threshold. They are scored against every choice once, here.
+    """
+    
+    def __init__(self, sql_df, pricing):
+        """
+        Args:
+            sql_df: DataFrame with SQL billable data
+            pricing: Pricing loaded from the SharePoint workbook
+        """
+        rate_card = pricing.rate_card
+        self.hours = sql_df['Hours'].to_numpy()
+        self.amount_billed = sql_df['BillableAmount'].to_numpy()
+        
+        self.employee_codes, employee_names = pd.factorize(sql_df['EmployeeName'], use_na_sentinel=False)
+        _, best, self.employee_scores = employee_candidates(pd.Series(employee_names), pricing.employees_df)
+        matched = pricing.employees_df['name'].to_numpy(dtype=object)[best]
+        # Rank when the name matches; unmatched employees are priced as Consultant
+        self.matched_rank_ids = rate_card.rank_ids(
+            pd.Series(matched).map(pricing.employee_ranks).fillna('Consultant')
+        )
+        self.default_rank_id = rate_card.rank_ids(['Consultant'])[0]
+        
+        self.customer_codes, customer_names = pd.factorize(sql_df['CustomerName'], use_na_sentinel=False)
+        _, (fcc_best, self.fcc_scores), (regular_best, self.regular_scores) = customer_candidates(
+            pd.Series(customer_names), pricing.fcc_customers, pricing.regular_customers
+        )
+        self.fcc_ids = _customer_ids(rate_card, 'FCC', pricing.fcc_customers.names, fcc_best)
+        self.regular_ids = _customer_ids(rate_card, 'Regular', pricing.regular_customers.names, regular_best)
+        
+        self.employee_amounts = np.bincount(
+            self.employee_codes, weights=self.amount_billed, minlength=len(employee_names)
+        )
+        self.customer_amounts = np.bincount(
+            self.customer_codes, weights=self.amount_billed, minlength=len(customer_names)
+        )
+        self.rate_card = rate_card
+    
+    def evaluate(self, employee_threshold, customer_threshold):
+        """
+        Match counts and reconciliation totals for one pair of thresholds
+        
+        Returns:
+            Dict with the thresholds, distinct matched/unmatched name counts,
+            billed amount on unmatched names and Aggregates.totals style totals
+        """
+        employee_matched = self.employee_scores >= employee_threshold
+        is_fcc = self.fcc_scores >= customer_threshold
+        is_regular = ~is_fcc & (self.regular_scores >= customer_threshold)
+        customer_matched = is_fcc | is_regular
+        
+        rank_ids = np.where(employee_matched, self.matched_rank_ids, self.default_rank_id)
+        customer_ids = np.select([is_fcc, is_regular], [self.fcc_ids, self.regular_ids], -1)
+        expected_rate, _ = self.rate_card.lookup(
+            customer_ids[self.customer_codes], rank_ids[self.employee_codes]
+        )
+        
+        # Same rules as reconcile_data: no or zero expected rate means nothing to compare
+        has_rate = ~np.isnan(expected_rate) & (expected_rate != 0)
+        expected_amount = np.where(has_rate, self.hours * expected_rate, np.nan)
+        discrepancy = self.amount_billed - expected_amount
+        with np.errstate(divide='ignore', invalid='ignore'):
+            discrepancy_pct = np.where(expected_amount != 0, discrepancy / expected_amount * 100, 0)
+        
+        return {
+            'employee_threshold': employee_threshold,
+            'customer_threshold': customer_threshold,
+            'matched_employees': int(employee_matched.sum()),
+            'unmatched_employees': int((~employee_matched).sum()),
+            'employee_amount_at_risk': self.employee_amounts[~employee_matched].sum(),
+            'matched_customers': int(customer_matched.sum()),
+            'unmatched_customers': int((~customer_matched).sum()),
+            'customer_amount_at_risk': self.customer_amounts[~customer_matched].sum(),
+            'expected_amount': np.nansum(expected_amount),
+            'discrepancy': np.nansum(discrepancy),
+            'discrepancy_records': int((has_rate & (np.abs(discrepancy_pct) > DISCREPANCY_THRESHOLD_PCT)).sum())
+        }
+
+
+def threshold_sweep(sql_df, pricing, employee_thresholds, customer_thresholds):
+    """
+    Evaluate every combination of employee and customer match thresholds
+    
+    Args:
+        sql_df: DataFrame with SQL billable data
+        pricing: Pricing loaded from the SharePoint workbook
+        employee_thresholds: Candidate EMPLOYEE_MATCH_THRESHOLD values
+        customer_thresholds: Candidate CUSTOMER_MATCH_THRESHOLD values
+    
+    Returns:
+        DataFrame with one MatchCandidates.evaluate() row per threshold pair
+    """
+    candidates = MatchCandidates(sql_df, pricing)
+    return pd.DataFrame([
+        candidates.evaluate(employee_threshold, customer_threshold)
+        for employee_threshold in employee_thresholds
+        for customer_threshold in customer_thresholds
+    ])
+
+
+def default_thresholds(current):
+    """Sweep values around a configured threshold: every 5 points from 60 to 100, plus the current one"""
+    return sorted(set(range(60, 101, 5)) | {current})
+
+
+def _customer_ids(rate_card, customer_type, choices, best):
+    """Rate card row of each name's best choice in one pricing list"""
+    if not choices:
+        return np.full(len(best), -1, dtype=np.int64)
+    names = np.array(choices, dtype=object)[best]
+    return rate_card.customer_ids([customer_type] * len(names), names)
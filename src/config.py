@@ -15,6 +15,13 @@ SQL_DATABASE = os.getenv('SQL_DATABASE')
 SQL_USERNAME = os.getenv('SQL_USERNAME')
 SQL_PASSWORD = os.getenv('SQL_PASSWORD')
 SQL_DRIVER = os.getenv('SQL_DRIVER', 'ODBC Driver 17 for SQL Server')
+SQL_POOL_SIZE = int(os.getenv('SQL_POOL_SIZE', '5'))
+
+# Billable data source: 'sqlserver', or 'local' for the SQLite mirror kept by sync_warehouse.py
+DATA_SOURCE = os.getenv('DATA_SOURCE', 'sqlserver')
+LOCAL_WAREHOUSE_FILE = os.getenv('LOCAL_WAREHOUSE_FILE', 'local_warehouse.sqlite')
+# Days before the newest local row that an incremental sync copies again, to pick up late edits
+LOCAL_SYNC_LOOKBACK_DAYS = 31
 
 # SharePoint Configuration (from .env)
 SHAREPOINT_SITE_URL = os.getenv('SHAREPOINT_SITE_URL')
@@ -26,6 +33,36 @@ SHAREPOINT_FILE_PATH = os.getenv('SHAREPOINT_FILE_PATH')
 EMPLOYEE_MATCH_THRESHOLD = 80
 CUSTOMER_MATCH_THRESHOLD = 85
 
+# Cores used to compute fuzzy match score matrices (-1 = all cores)
+MATCH_WORKERS = 1
+
+# Processes reconciling months in parallel in batch mode (None = all cores)
+BATCH_WORKERS = None
+
+# Rows per SQL chunk in streaming mode (main.py --stream)
+STREAM_CHUNK_SIZE = 50_000
+
+# Local month-partitioned Parquet copy of the billable data extract
+SNAPSHOT_CACHE_DIR = 'snapshot_cache'
+
+# ETag / last-modified of the pricing workbook last downloaded from SharePoint
+PRICING_SYNC_STATE_FILE = 'pricing_sync.json'
+
+# Parsed pricing tables, reused while the workbook is unchanged; kept next to the workbook
+PRICING_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data', 'pricing_cache.pkl')
+
+# Cross-run store of fuzzy match results (rebuilt when the workbook or thresholds change)
+ALIAS_CACHE_FILE = 'match_aliases.sqlite'
+
+# Reconciled rows of the last run, so main.py --delta only redoes new or changed rows
+RESULT_STORE_FILE = 'reconciliation_results.sqlite'
+
+# Local HTTP reconciliation service (serve.py)
+SERVICE_HOST = os.getenv('SERVICE_HOST', '127.0.0.1')
+SERVICE_PORT = int(os.getenv('SERVICE_PORT', '8765'))
+# Minimum seconds between the service's SharePoint checks for a new pricing workbook
+SERVICE_SYNC_INTERVAL = 300
+
 # Title normalization mapping
 TITLE_TO_RANK = {
     # Junior roles -> Junior Consultant pricing
@@ -52,4 +89,12 @@ TITLE_TO_RANK = {
     
     # Data Scientist -> Data Scientist pricing
     "data scientist": "Data Scientist"
+}
+
+# Title fragments naming a seniority level. In a title that also names a role
+# ("Junior Support", "Senior Data Scientist") the seniority fragment decides the rank.
+SENIORITY_TITLE_KEYS = {
+    "junior", "junior dev", "junior ba",
+    "senior", "senior dev", "senior ba", "tl", "senior ba/tl",
+    "principal", "principal dev", "principal ba"
 }
\ No newline at end of file
@@ -4,7 +4,7 @@ Run this first to verify your SQL connection and understand the data
 """
 
 import pandas as pd
-from Data.data_sources import connect_to_sql
+from Data.data_sources import connect_to_sql, get_source
 
 
 def test_connection():
@@ -31,8 +31,9 @@ def explore_tables():
     print("FACT TABLE - Sample Billable Entries")
     print("=" * 80)
     
-    query = """
-    SELECT TOP 5
+    top, limit = get_source().row_limit(5)
+    query = f"""
+    SELECT {top}
         Hours,
         BillableRate,
         BillableAmount,
@@ -42,6 +43,7 @@ def explore_tables():
     FROM PowerBIData.FactTable_HARVEST_Actual
     WHERE IsBillableKey = 1
     ORDER BY Date DESC
+    {limit}
     """
     
     df = pd.read_sql(query, conn)
@@ -51,12 +53,14 @@ def explore_tables():
     print("EMPLOYEES - Sample Employee Names")
     print("=" * 80)
     
-    query = """
-    SELECT TOP 10
+    top, limit = get_source().row_limit(10)
+    query = f"""
+    SELECT {top}
         EmployeeKey,
         EmployeeName
     FROM PowerBIData.DimEmployee_Tabular_Flat
     WHERE EmployeeName IS NOT NULL
+    {limit}
     """
     
     df = pd.read_sql(query, conn)
@@ -66,12 +70,14 @@ def explore_tables():
     print("CUSTOMERS - Sample Customer Names")
     print("=" * 80)
     
-    query = """
-    SELECT TOP 10
+    top, limit = get_source().row_limit(10)
+    query = f"""
+    SELECT {top}
         CustomerKey,
         CustomerName
     FROM PowerBIData.DimCustomer_Tabular_Flat
     WHERE CustomerName IS NOT NULL
+    {limit}
     """
     
     df = pd.read_sql(query, conn)
@@ -81,8 +87,9 @@ def explore_tables():
     print("JOINED DATA - Sample Complete Records")
     print("=" * 80)
     
-    query = """
-    SELECT TOP 5
+    top, limit = get_source().row_limit(5)
+    query = f"""
+    SELECT {top}
         f.Hours,
         f.BillableRate,
         f.BillableAmount,
@@ -94,6 +101,7 @@ def explore_tables():
     JOIN PowerBIData.DimEmployee_Tabular_Flat e ON f.EmployeeKey = e.EmployeeKey
     WHERE f.IsBillableKey = 1
     ORDER BY f.Date DESC
+    {limit}
     """
     
     df = pd.read_sql(query, conn)
@@ -3,58 +3,372 @@ Main Script
 Orchestrates the entire hours reconciliation process
 """
 
-from Data.data_sources import get_billable_data, get_sharepoint_data
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import chain
+import config
+import metrics
+from Data.data_sources import PRICING_FILE, iter_billable_data, get_sharepoint_data
+from Data.sharepoint_sync import sync_pricing
+from Data.snapshot_cache import get_billable_data_cached
+from Workflow.aggregation import Aggregates
+from Workflow.alias_cache import AliasCache, pricing_fingerprint
+from Workflow.batch import month_range, run_batch
+from Workflow.delta import ResultStore, reconcile_delta
+from Workflow.pricing import Pricing
 from Workflow.reconciliation import reconcile_data
-from Workflow.report import create_report
+from Workflow.report import (
+    create_delta_report, create_report, create_rollup_report, create_server_report,
+    create_what_if_report
+)
+from Workflow.server_side import reconcile_on_server
+from Workflow.what_if import default_thresholds, threshold_sweep
+from Workflow.streaming import reconcile_stream
 
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Billing reconciliation")
+    parser.add_argument(
+        '--stream', action='store_true',
+        help=f"Reconcile in chunks of {config.STREAM_CHUNK_SIZE} rows with bounded memory"
+    )
+    parser.add_argument(
+        '--server-side', action='store_true',
+        help="Price rows in the database and fetch only discrepancies and per-customer/employee totals"
+    )
+    parser.add_argument(
+        '--delta', action='store_true',
+        help="Reconcile only rows new or changed since the last --delta run and report what changed"
+    )
+    parser.add_argument(
+        '--what-if', action='store_true',
+        help="Tabulate match counts, amount at risk and discrepancy totals over a sweep of match thresholds"
+    )
+    parser.add_argument(
+        '--employee-thresholds', nargs='+', type=int, metavar='SCORE',
+        default=default_thresholds(config.EMPLOYEE_MATCH_THRESHOLD),
+        help="Employee match thresholds to try with --what-if (default: 60-100 in steps of 5)"
+    )
+    parser.add_argument(
+        '--customer-thresholds', nargs='+', type=int, metavar='SCORE',
+        default=default_thresholds(config.CUSTOMER_MATCH_THRESHOLD),
+        help="Customer match thresholds to try with --what-if (default: 60-100 in steps of 5)"
+    )
+    parser.add_argument(
+        '--export', nargs='+', choices=['csv', 'parquet'], default=[],
+        help="Also write every report sheet in these formats"
+    )
+    parser.add_argument(
+        '--export-rate-card', metavar='FILE',
+        help="Write the pricing workbook's expected rate per customer and rank to FILE as CSV and exit"
+    )
+    parser.add_argument(
+        '--from-month', metavar='YYYY-MM',
+        help="First month to reconcile (all months when omitted)"
+    )
+    parser.add_argument(
+        '--to-month', metavar='YYYY-MM',
+        help="Last month to reconcile; several months run in parallel, one report each plus a roll-up"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=config.BATCH_WORKERS,
+        help="Worker processes for a month range (default: all cores)"
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="Write cProfile stats for the run next to the metrics file"
+    )
+    parser.add_argument(
+        '--trace-memory', action='store_true',
+        help="Record per-stage Python allocation peaks and top allocation sites with tracemalloc"
+    )
+    args = parser.parse_args()
+    
+    if args.to_month and not args.from_month:
+        parser.error("--to-month requires --from-month")
+    months = month_range(args.from_month, args.to_month or args.from_month) if args.from_month else None
+    if args.stream and months and len(months) > 1:
+        parser.error("--stream reconciles a single month or all months")
+    if sum([args.stream, args.server_side, args.what_if, args.delta, bool(args.export_rate_card)]) > 1:
+        parser.error("--stream, --server-side, --what-if, --delta and --export-rate-card cannot be combined")
+    
     print("=" * 60)
     print("BILLING RECONCILIATION")
     print("=" * 60)
     
-    # Get month filter
-    month_filter = input("Enter month (YYYY-MM) or press Enter for all: ").strip()
-    if not month_filter:
-        month_filter = None
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    run_metrics = metrics.RunMetrics(trace_memory=args.trace_memory, profile=args.profile)
+    if args.export_rate_card:
+        export_rate_card(args.export_rate_card, run_metrics)
+    elif args.delta:
+        run_delta(months, args.export, run_metrics)
+    elif args.what_if:
+        run_what_if(months, args.employee_thresholds, args.customer_thresholds, args.export, run_metrics)
+    elif args.server_side:
+        run_server_side(months, args.export, run_metrics)
+    elif args.stream:
+        run_streaming(months, args.export, run_metrics)
+    elif months and len(months) > 1:
+        run_months(months, args.workers, args.export, run_metrics)
+    else:
+        run(months, args.export, run_metrics)
     
-    # Step 1: Extract SQL data
-    print("\n1. Extracting billable data from SQL...")
-    sql_df = get_billable_data(month_filter)
-    print(f"   Found {len(sql_df)} billable entries")
+    metrics_file = run_metrics.save(f'billing_reconciliation_{timestamp}_metrics.json')
+    print(f"\nMetrics saved: {metrics_file}")
     
-    # Step 2: Get pricing data from local file
-    print("\n2. Reading pricing data from local file...")
-    employees_df, regular_df, fcc_df = get_sharepoint_data()
-    print(f"   Loaded {len(employees_df)} employees")
-    print(f"   Loaded {len(regular_df)} regular customers")
-    print(f"   Loaded {len(fcc_df)} FCC customers")
+    print("\n" + "=" * 60)
+    print("RECONCILIATION COMPLETE")
+    print("=" * 60)
+
+
+def run(months, extra_formats, run_metrics):
+    """Reconcile with the full extract in memory"""
+    sql_df, pricing, fingerprint = load_inputs(months, run_metrics)
     
     # Step 3: Reconcile
     print("\n3. Reconciling data...")
-    results_df, unmatched_employees, unmatched_customers = reconcile_data(
-        sql_df, employees_df, regular_df, fcc_df
+    with run_metrics.stage('reconcile') as stage:
+        alias_cache = AliasCache(config.ALIAS_CACHE_FILE, fingerprint)
+        results_df, unmatched_employees, unmatched_customers = reconcile_data(sql_df, pricing, alias_cache)
+        alias_cache.close()
+        stage['rows'] = len(results_df)
+    count_unmatched(unmatched_employees, unmatched_customers)
+    
+    # Calculate statistics and roll-ups once for the console and every report sheet
+    with run_metrics.stage('aggregate') as stage:
+        aggregates = Aggregates.from_results(results_df)
+        stage['rows'] = len(results_df)
+    totals = aggregates.totals
+    print(f"   Found {totals['discrepancy_records']} entries with >1% discrepancy")
+    print(f"   Total discrepancy: {totals['discrepancy']:,.2f}")
+    
+    print_unmatched(unmatched_employees, unmatched_customers)
+    
+    # Step 4: Generate report
+    print("\n4. Generating report...")
+    with run_metrics.stage('report') as stage:
+        output_file = create_report(
+            results_df, unmatched_employees, unmatched_customers, extra_formats, aggregates=aggregates
+        )
+        stage['rows'] = len(results_df)
+    print(f"   Report saved: {output_file}")
+
+
+def run_streaming(months, extra_formats, run_metrics):
+    """Reconcile the extract chunk by chunk, writing records to CSV"""
+    # Step 1: Get pricing data from local file, while SQL returns the first chunk
+    print("\n1. Reading pricing data from local file...")
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pricing_future = pool.submit(load_pricing, run_metrics)
+        with run_metrics.stage('extract_first_chunk'):
+            chunks = iter_billable_data(config.STREAM_CHUNK_SIZE, months=months)
+            first_chunk = next(chunks, None)
+        pricing, fingerprint = pricing_future.result()
+    print_pricing(pricing)
+    
+    # Step 2: Stream SQL data through reconciliation
+    print("\n2. Extracting and reconciling billable data from SQL...")
+    # Extraction and reconciliation interleave chunk by chunk, so they are one stage
+    with run_metrics.stage('extract_and_reconcile') as stage:
+        alias_cache = AliasCache(config.ALIAS_CACHE_FILE, fingerprint)
+        records_file, aggregates, unmatched_employees, unmatched_customers = reconcile_stream(
+            chain([first_chunk], chunks) if first_chunk is not None else chunks, pricing, alias_cache
+        )
+        alias_cache.close()
+        totals = aggregates.totals
+        stage['rows'] = totals['records']
+    count_unmatched(unmatched_employees, unmatched_customers)
+    print(f"   Reconciled {totals['records']} billable entries")
+    print(f"   Found {totals['discrepancy_records']} entries with >1% discrepancy")
+    print(f"   Total discrepancy: {totals['discrepancy']:,.2f}")
+    
+    print_unmatched(unmatched_employees, unmatched_customers)
+    
+    # Step 3: Generate report
+    print("\n3. Generating report...")
+    with run_metrics.stage('report'):
+        output_file = create_rollup_report(
+            aggregates, unmatched_employees, unmatched_customers, extra_formats
+        )
+    print(f"   Records saved: {records_file}")
+    print(f"   Report saved: {output_file}")
+
+
+def run_server_side(months, extra_formats, run_metrics):
+    """Reconcile in the database, transferring only discrepancies and totals"""
+    # Step 1: Get pricing data from local file
+    print("\n1. Reading pricing data from local file...")
+    pricing, fingerprint = load_pricing(run_metrics)
+    print_pricing(pricing)
+    
+    # Step 2: Resolve names, load pricing temp tables and reconcile on the server
+    print("\n2. Reconciling billable data on the server...")
+    with run_metrics.stage('server_reconcile') as stage:
+        alias_cache = AliasCache(config.ALIAS_CACHE_FILE, fingerprint)
+        aggregates, unmatched_employees, unmatched_customers = reconcile_on_server(
+            pricing, alias_cache, months=months
+        )
+        alias_cache.close()
+        totals = aggregates.totals
+        stage['rows'] = totals['records']
+    count_unmatched(unmatched_employees, unmatched_customers)
+    print(f"   Reconciled {totals['records']} billable entries")
+    print(f"   Found {totals['discrepancy_records']} entries with >1% discrepancy")
+    print(f"   Total discrepancy: {totals['discrepancy']:,.2f}")
+    
+    print_unmatched(unmatched_employees, unmatched_customers)
+    
+    # Step 3: Generate report
+    print("\n3. Generating report...")
+    with run_metrics.stage('report') as stage:
+        output_file = create_server_report(
+            aggregates, unmatched_employees, unmatched_customers, extra_formats
+        )
+        stage['rows'] = len(aggregates.discrepancies)
+    print(f"   Report saved: {output_file}")
+
+
+def run_delta(months, extra_formats, run_metrics):
+    """Reconcile rows new or changed since the previous run and report the difference"""
+    sql_df, pricing, fingerprint = load_inputs(months, run_metrics)
+    
+    # Step 3: Reconcile what changed; a new pricing fingerprint redoes every row
+    print("\n3. Reconciling new and changed entries...")
+    with run_metrics.stage('reconcile') as stage:
+        alias_cache = AliasCache(config.ALIAS_CACHE_FILE, fingerprint)
+        store = ResultStore(config.RESULT_STORE_FILE, fingerprint)
+        results_df, delta, counts, unmatched_employees, unmatched_customers = reconcile_delta(
+            sql_df, pricing, alias_cache, store, months
+        )
+        store.close()
+        alias_cache.close()
+        stage['rows'] = counts['reconciled']
+    count_unmatched(unmatched_employees, unmatched_customers)
+    aggregates = Aggregates.from_results(results_df, keep_discrepancies=False)
+    totals = aggregates.totals
+    print(f"   Reused {counts['reused']}, reconciled {counts['reconciled']}, removed {counts['removed']} entries")
+    print(
+        f"   Discrepancies: {len(delta['added'])} added, {len(delta['resolved'])} resolved, "
+        f"{len(delta['changed'])} changed ({totals['discrepancy_records']} in total)"
     )
+    print(f"   Total discrepancy: {totals['discrepancy']:,.2f}")
     
-    # Calculate statistics
-    discrepancies = results_df[abs(results_df['discrepancy_pct']) > 1]
-    print(f"   Found {len(discrepancies)} entries with >1% discrepancy")
-    print(f"   Total discrepancy: {results_df['discrepancy'].sum():,.2f}")
+    print_unmatched(unmatched_employees, unmatched_customers)
+    
+    # Step 4: Generate report
+    print("\n4. Generating report...")
+    with run_metrics.stage('report'):
+        output_file = create_delta_report(
+            delta, aggregates, counts, unmatched_employees, unmatched_customers, extra_formats
+        )
+    print(f"   Report saved: {output_file}")
+
+
+def run_what_if(months, employee_thresholds, customer_thresholds, extra_formats, run_metrics):
+    """Evaluate match thresholds from one round of fuzzy scoring"""
+    sql_df, pricing, _ = load_inputs(months, run_metrics)
     
-    if unmatched_employees:
-        print(f"   WARNING: {len(set(unmatched_employees))} unmatched employees")
-    if unmatched_customers:
-        print(f"   WARNING: {len(set(unmatched_customers))} unmatched customers")
+    # Step 3: Score every distinct name once, then re-evaluate per threshold pair
+    print(
+        f"\n3. Evaluating {len(employee_thresholds)} employee x "
+        f"{len(customer_thresholds)} customer thresholds..."
+    )
+    with run_metrics.stage('what_if') as stage:
+        sweep_df = threshold_sweep(sql_df, pricing, employee_thresholds, customer_thresholds)
+        stage['rows'] = len(sql_df)
+    print(sweep_df.to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
     
     # Step 4: Generate report
     print("\n4. Generating report...")
-    output_file = create_report(results_df, unmatched_employees, unmatched_customers)
+    with run_metrics.stage('report'):
+        output_file = create_what_if_report(sweep_df, extra_formats)
     print(f"   Report saved: {output_file}")
+
+
+def run_months(months, workers, extra_formats, run_metrics):
+    """Reconcile a month range in parallel worker processes"""
+    # Step 1: Get pricing data from local file
+    print("\n1. Reading pricing data from local file...")
+    pricing, fingerprint = load_pricing(run_metrics)
+    print_pricing(pricing)
     
-    print("\n" + "=" * 60)
-    print("RECONCILIATION COMPLETE")
-    print("=" * 60)
+    # Step 2: One extract, reconciliation and report per month
+    print(f"\n2. Reconciling {len(months)} months ({months[0]} to {months[-1]})...")
+    with run_metrics.stage('batch'):
+        rollup_file, month_reports = run_batch(
+            months, pricing, fingerprint, workers, extra_formats, run_metrics
+        )
+    for month, report in month_reports.items():
+        print(f"   {month}: {report}")
+    print(f"   Roll-up saved: {rollup_file}")
+
+
+def export_rate_card(path, run_metrics):
+    """Write the rate card built from the pricing workbook as CSV"""
+    print("\n1. Reading pricing data from local file...")
+    pricing, _ = load_pricing(run_metrics)
+    print_pricing(pricing)
+    
+    print("\n2. Exporting rate card...")
+    print(f"   Rate card saved: {pricing.rate_card.save(path)}")
+
+
+def load_inputs(months, run_metrics):
+    """
+    Extract the billable data and load the pricing workbook side by side
+    
+    Returns:
+        Tuple of (sql_df, Pricing, alias cache fingerprint)
+    """
+    # Steps 1 and 2 are independent: the pricing workbook is parsed and its
+    # match indexes built while the SQL extract waits on the database
+    print("\n1. Extracting billable data from SQL...")
+    print("2. Reading pricing data from local file (in parallel)...")
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pricing_future = pool.submit(load_pricing, run_metrics)
+        with run_metrics.stage('extract') as stage:
+            sql_df = get_billable_data_cached(months)
+            stage['rows'] = len(sql_df)
+        pricing, fingerprint = pricing_future.result()
+    print(f"   Found {len(sql_df)} billable entries")
+    print_pricing(pricing)
+    return sql_df, pricing, fingerprint
+
+
+def load_pricing(run_metrics):
+    """
+    Parse the pricing workbook and eagerly build the rate card and match indexes
+    
+    Returns:
+        Tuple of (Pricing, alias cache fingerprint)
+    """
+    with run_metrics.stage('pricing'):
+        sync_pricing()
+        return Pricing(*get_sharepoint_data()), pricing_fingerprint(PRICING_FILE)
+
+
+def print_pricing(pricing):
+    print(f"   Loaded {len(pricing.employees_df)} employees")
+    print(f"   Loaded {len(pricing.regular_df)} regular customers")
+    print(f"   Loaded {len(pricing.fcc_df)} FCC customers")
+
+
+def print_unmatched(unmatched_employees, unmatched_customers):
+    for unmatched, label in [(unmatched_employees, 'employees'), (unmatched_customers, 'customers')]:
+        if len(unmatched):
+            print(
+                f"   WARNING: {len(unmatched)} unmatched {label} "
+                f"({unmatched['occurrences'].sum()} entries, "
+                f"{unmatched['amount_at_risk'].sum():,.2f} billed unchecked)"
+            )
+
+
+def count_unmatched(unmatched_employees, unmatched_customers):
+    """Record distinct unmatched names in the run counters"""
+    metrics.count('unmatched_employees', len(unmatched_employees))
+    metrics.count('unmatched_customers', len(unmatched_customers))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+"""
+Metrics Module
+Per-stage timings and run counters, saved as a JSON file per run
+"""
+
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Event counts for the current run (fuzzy comparisons, cache hits/misses, ...)
+counters = Counter()
+
+
+def count(name, n=1):
+    """Add n to a run counter"""
+    counters[name] += int(n)
+
+
+class RunMetrics:
+    """
+    Wall time, CPU time, memory growth and throughput per stage of a run
+    
+    The OS only reports the process peak RSS since start, so a stage records
+    how far it raised that peak (0 when it stayed below an earlier stage's)
+    and the run records the peak itself. CPU time and RSS are process-wide,
+    so stages that overlap (pricing loading during the SQL extract) each
+    include the other's share. With trace_memory, tracemalloc adds the peak
+    Python allocation within each stage and the top allocation sites; with
+    profile, cProfile stats for the whole run are written next to the
+    metrics file.
+    """
+    
+    def __init__(self, trace_memory=False, profile=False):
+        """
+        Args:
+            trace_memory: Track Python allocations with tracemalloc (slow)
+            profile: Profile the run with cProfile (slow)
+        """
+        self.started = datetime.now()
+        self.stages = {}
+        self.children = {}
+        self.trace_memory = trace_memory
+        self._wall_start = time.perf_counter()
+        self._profiler = cProfile.Profile() if profile else None
+        counters.clear()
+        
+        if trace_memory:
+            tracemalloc.start()
+        if self._profiler:
+            self._profiler.enable()
+    
+    @contextmanager
+    def stage(self, name):
+        """
+        Measure a stage; set 'rows' on the yielded dict to get rows/sec
+        
+        Usage:
+            with metrics.stage('extract') as stage:
+                df = get_billable_data()
+                stage['rows'] = len(df)
+        """
+        stage = {}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        rss = peak_rss_mb()
+        try:
+            yield stage
+        finally:
+            stage['wall_seconds'] = round(time.perf_counter() - wall, 4)
+            stage['cpu_seconds'] = round(time.process_time() - cpu, 4)
+            if rss is not None:
+                stage['peak_rss_growth_mb'] = round(peak_rss_mb() - rss, 1)
+            if self.trace_memory:
+                stage['traced_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            if 'rows' in stage and stage['wall_seconds'] > 0:
+                stage['rows_per_second'] = round(stage['rows'] / stage['wall_seconds'], 1)
+            self.stages[name] = stage
+    
+    def add_child(self, name, child):
+        """Record a worker's to_dict() output and add its counters to this run"""
+        self.children[name] = child
+        counters.update(child['counters'])
+    
+    def to_dict(self):
+        metrics = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self._wall_start, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': self.stages,
+            'counters': dict(counters)
+        }
+        if self.children:
+            metrics['children'] = self.children
+        return metrics
+    
+    def save(self, path):
+        """
+        Stop profiling/tracing and write the metrics JSON
+        
+        Returns:
+            Path of the metrics file
+        """
+        if self._profiler:
+            self._profiler.disable()
+            self._profiler.dump_stats(path.rsplit('.', 1)[0] + '.prof')
+        
+        metrics = self.to_dict()
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            metrics['top_allocations'] = [
+                {'location': str(stat.traceback), 'size_mb': round(stat.size / 2**20, 2), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:20]
+            ]
+        
+        with open(path, 'w') as f:
+            json.dump(metrics, f, indent=2, default=str)
+        return path
+
+
+def peak_rss_mb():
+    """Process peak resident set size so far in MB, None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
@@ -0,0 +1,241 @@
+"""
+Reconciliation Service
+Long-running local HTTP API that keeps pricing and match indexes warm
+
+Endpoints:
+    GET /health
+    GET /reconcile?month=YYYY-MM&customer=...&employee=...&format=json|xlsx
+
+month is optional (all months when omitted). customer and employee filter on
+either the SQL name or the matched pricing name, ignoring case.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pandas as pd
+import config
+import metrics
+from Data.data_sources import PRICING_FILE, get_sharepoint_data
+from Data.sharepoint_sync import sync_pricing
+from Data.snapshot_cache import get_billable_data_cached
+from Workflow.aggregation import Aggregates
+from Workflow.alias_cache import AliasCache, pricing_fingerprint
+from Workflow.pricing import Pricing
+from Workflow.reconciliation import reconcile_data, unmatched_from_rows
+from Workflow.report import create_report
+
+
+DISCREPANCY_COLUMNS = [
+    'date', 'sql_customer', 'sql_employee', 'matched_customer', 'matched_employee',
+    'normalized_rank', 'hours', 'rate_charged', 'expected_rate', 'amount_billed',
+    'expected_amount', 'discrepancy', 'discrepancy_pct'
+]
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class ReconciliationService:
+    """
+    Pricing state shared by all requests
+    
+    The workbook is parsed and its rate card and match indexes built once;
+    they are rebuilt only when the workbook file changes, including after
+    a SharePoint sync brought in a new version.
+    """
+    
+    def __init__(self, sync_interval=config.SERVICE_SYNC_INTERVAL):
+        """
+        Args:
+            sync_interval: Minimum seconds between SharePoint checks
+        """
+        self.sync_interval = sync_interval
+        self.pricing = None
+        self.fingerprint = None
+        self.loaded_at = None
+        self._workbook_stat = None
+        self._synced_at = None
+        # Requests run one at a time: they share the snapshot and alias caches on disk
+        self._lock = threading.Lock()
+    
+    def refresh(self):
+        """
+        Sync the workbook if due and reload pricing if the file changed
+        
+        Returns:
+            True if pricing was (re)loaded
+        """
+        if self._synced_at is None or time.monotonic() - self._synced_at >= self.sync_interval:
+            sync_pricing()
+            self._synced_at = time.monotonic()
+        
+        stat = os.stat(PRICING_FILE)
+        if (stat.st_mtime, stat.st_size) == self._workbook_stat:
+            return False
+        
+        self.pricing = Pricing(*get_sharepoint_data())
+        self.fingerprint = pricing_fingerprint(PRICING_FILE)
+        self.loaded_at = datetime.now()
+        self._workbook_stat = (stat.st_mtime, stat.st_size)
+        metrics.count('service_pricing_loads')
+        return True
+    
+    def reconcile(self, month=None, customer=None, employee=None):
+        """
+        Reconcile a month (or all months), optionally for one customer or employee
+        
+        Returns:
+            Tuple of (results_df, unmatched_employees, unmatched_customers)
+        """
+        with self._lock:
+            self.refresh()
+            sql_df = get_billable_data_cached([month] if month else None)
+            alias_cache = AliasCache(config.ALIAS_CACHE_FILE, self.fingerprint)
+            try:
+                results_df, unmatched_employees, unmatched_customers = reconcile_data(
+                    sql_df, self.pricing, alias_cache
+                )
+            finally:
+                alias_cache.close()
+            metrics.count('service_requests')
+        
+        if not (customer or employee):
+            return results_df, unmatched_employees, unmatched_customers
+        # Matches are known only after resolving names, so filter the reconciled rows
+        rows = results_df[(
+            _name_mask(results_df, 'customer', customer) & _name_mask(results_df, 'employee', employee)
+        ).to_numpy()].reset_index(drop=True)
+        return (
+            rows,
+            unmatched_from_rows(
+                rows[rows['matched_employee'].isna().to_numpy()], 'sql_employee',
+                unmatched_employees.set_index('name')['match_score']
+            ),
+            unmatched_from_rows(
+                rows[rows['customer_type'].isna().to_numpy()], 'sql_customer',
+                unmatched_customers.set_index('name')['match_score']
+            )
+        )
+
+
+def _name_mask(results_df, kind, name):
+    """Rows whose SQL or matched name equals name, ignoring case; all rows when name is empty"""
+    if not name:
+        return pd.Series(True, index=results_df.index)
+    name = name.strip().casefold()
+    return (
+        (results_df[f'sql_{kind}'].astype(object).str.strip().str.casefold() == name)
+        | (results_df[f'matched_{kind}'].astype(object).str.strip().str.casefold() == name)
+    )
+
+
+def make_handler(service):
+    """Request handler class bound to a ReconciliationService"""
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                if url.path == '/health':
+                    self._send_json(200, {
+                        'status': 'ok',
+                        'pricing_loaded_at': service.loaded_at.isoformat() if service.loaded_at else None
+                    })
+                elif url.path == '/reconcile':
+                    self._reconcile(query)
+                else:
+                    self._send_json(404, {'error': f"Unknown path: {url.path}"})
+            except ValueError as error:
+                self._send_json(400, {'error': str(error)})
+            except Exception as error:
+                self._send_json(500, {'error': str(error)})
+        
+        def _reconcile(self, query):
+            started = time.perf_counter()
+            month = query.get('month')
+            if month:
+                datetime.strptime(month, '%Y-%m')  # ValueError -> 400
+            output_format = query.get('format', 'json')
+            if output_format not in ('json', 'xlsx'):
+                raise ValueError(f"Unsupported format: {output_format}")
+            
+            results_df, unmatched_employees, unmatched_customers = service.reconcile(
+                month, query.get('customer'), query.get('employee')
+            )
+            aggregates = Aggregates.from_results(results_df)
+            
+            if output_format == 'xlsx':
+                with tempfile.TemporaryDirectory() as tmp:
+                    report = create_report(
+                        results_df, unmatched_employees, unmatched_customers,
+                        output_file=os.path.join(tmp, 'report.xlsx'), aggregates=aggregates
+                    )
+                    with open(report, 'rb') as f:
+                        content = f.read()
+                self._send(200, content, XLSX_CONTENT_TYPE, {
+                    'Content-Disposition': f'attachment; filename="billing_reconciliation_{month or "all"}.xlsx"'
+                })
+                return
+            
+            totals = aggregates.totals
+            discrepancies = aggregates.discrepancies[DISCREPANCY_COLUMNS]
+            self._send_json(200, {
+                'month': month,
+                'summary': {
+                    key: int(value) if key.endswith('records') else float(value)
+                    for key, value in totals.items()
+                },
+                'discrepancies': _records(discrepancies.sort_values('discrepancy', key=abs, ascending=False)),
+                'unmatched_employees': _records(unmatched_employees),
+                'unmatched_customers': _records(unmatched_customers),
+                'seconds': round(time.perf_counter() - started, 3)
+            })
+        
+        def _send_json(self, status, payload):
+            self._send(status, json.dumps(payload).encode(), 'application/json')
+        
+        def _send(self, status, content, content_type, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(content)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(content)
+    
+    return Handler
+
+
+def _records(frame):
+    """DataFrame as a list of JSON-ready dicts, NaN as null and dates as ISO strings"""
+    return json.loads(frame.to_json(orient='records', date_format='iso'))
+
+
+def main():
+    """Load pricing, then serve requests until interrupted"""
+    parser = argparse.ArgumentParser(description="Billing reconciliation HTTP service")
+    parser.add_argument('--host', default=config.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVICE_PORT)
+    args = parser.parse_args()
+    
+    service = ReconciliationService()
+    service.refresh()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Serving reconciliation on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
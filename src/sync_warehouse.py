@@ -0,0 +1,34 @@
+"""
+Local Warehouse Sync
+Copies the Harvest fact table and its dimensions from SQL Server into the
+local SQLite mirror used when DATA_SOURCE=local
+"""
+
+import argparse
+from datetime import datetime
+import config
+from Data.local_warehouse import sync_local_warehouse
+
+
+def main():
+    """Sync the local warehouse"""
+    parser = argparse.ArgumentParser(description="Sync the local warehouse from SQL Server")
+    parser.add_argument(
+        '--since', metavar='YYYY-MM-DD',
+        type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+        help=f"First date to copy again (default: {config.LOCAL_SYNC_LOOKBACK_DAYS} days before the newest local row)"
+    )
+    parser.add_argument('--full', action='store_true', help="Replace all fact rows")
+    parser.add_argument(
+        '--path', default=config.LOCAL_WAREHOUSE_FILE,
+        help=f"SQLite file (default: {config.LOCAL_WAREHOUSE_FILE})"
+    )
+    args = parser.parse_args()
+
+    print(f"Syncing {args.path} from {config.SQL_SERVER}...")
+    since, rows = sync_local_warehouse(args.since, args.full, args.path)
+    print(f"Copied {rows} fact rows {'from ' + str(since) if since else '(full copy)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Shared test setup
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'src'))
+# Synthetic names and workbooks are shared with the benchmarks
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'benchmarks'))
@@ -0,0 +1,34 @@
+"""
+CustomerIndex against the exhaustive customer scan
+"""
+
+import random
+import pytest
+from synthetic import synthetic_customers, with_typos
+from Workflow.matching import CustomerIndex, extract_best
+
+
+@pytest.mark.parametrize('count', [0, 1, 128, 2000])
+def test_matches_full_scan(count):
+    rnd = random.Random(count)
+    customers = synthetic_customers(count, rnd)
+    queries = [with_typos(rnd.choice(customers), rnd) for _ in range(300)] if customers else []
+    queries += ['UNKNOWN CUSTOMER 1', 'AB', 'A', '', '/', 'ÆØÅ\xa0HOLDING ®']
+    queries = [query.strip().upper() for query in queries]
+    
+    best, scores = CustomerIndex(customers).extract_best(queries)
+    expected_best, expected_scores = extract_best(queries, customers, 'ratio')
+    assert scores.tolist() == expected_scores.tolist()
+    assert best.tolist() == expected_best.tolist()
+
+
+def test_random_strings_match_full_scan():
+    rnd = random.Random(0)
+    alphabet = 'ABCDE /-.\xa0Ø'
+    customers = [''.join(rnd.choices(alphabet, k=rnd.randint(0, 10))) for _ in range(300)]
+    queries = [''.join(rnd.choices(alphabet, k=rnd.randint(0, 10))) for _ in range(1000)]
+    
+    best, scores = CustomerIndex(customers).extract_best(queries)
+    expected_best, expected_scores = extract_best(queries, customers, 'ratio')
+    assert scores.tolist() == expected_scores.tolist()
+    assert best.tolist() == expected_best.tolist()
@@ -0,0 +1,72 @@
+"""
+Delta runs against a result store
+"""
+
+import pandas as pd
+import pytest
+from Workflow.alias_cache import AliasCache
+from Workflow.delta import ResultStore, reconcile_delta
+from Workflow.pricing import Pricing
+
+
+EMPLOYEES = pd.DataFrame({
+    'name': ['Sam K Andersen', 'Anne Holm'],
+    'title': ['Senior dev', 'Junior BA']
+})
+REGULAR = pd.DataFrame({
+    'customer': ['Acme A/S'],
+    'Junior Consultant': [900],
+    'Consultant': [1100],
+    'Senior Consultant': [1300],
+    'Principal Consultant': [1500],
+    'Data Scientist': [1400],
+    'Support': [800]
+})
+FCC = pd.DataFrame({'customer': ['Vesthavn Group'], 'Consultant': [1200]})
+
+COLUMNS = ['Date', 'CustomerName', 'EmployeeName', 'Hours', 'BillableRate', 'BillableAmount']
+JANUARY = pd.DataFrame([
+    (pd.Timestamp('2026-01-05'), 'ACME A/S', 'SKA - Sam K. Andersen', 7.5, 1300.0, 9750.0),
+    (pd.Timestamp('2026-01-06'), 'ACME A/S', 'SKA - Sam K. Andersen', 7.5, 1200.0, 9000.0),
+    (pd.Timestamp('2026-01-06'), 'Vesthavn Group', 'AH - Anne Holm', 4.0, 1200.0, 4800.0),
+    (pd.Timestamp('2026-01-07'), 'Unknown Customer Ltd', 'XX - Nobody Here', 1.0, 1000.0, 1000.0)
+], columns=COLUMNS)
+# An extract with no rows comes back from read_sql with object columns
+EMPTY = pd.DataFrame({column: pd.Series(dtype=object) for column in COLUMNS})
+
+
+@pytest.fixture
+def run(tmp_path):
+    """reconcile_delta against one store and alias cache kept for the test"""
+    pricing = Pricing(EMPLOYEES, REGULAR, FCC)
+    alias_cache = AliasCache(':memory:', 'test')
+    store = ResultStore(str(tmp_path / 'results.sqlite'), 'test')
+    yield lambda sql_df, months: reconcile_delta(sql_df, pricing, alias_cache, store, months)
+    store.close()
+    alias_cache.close()
+
+
+def test_reuses_unchanged_rows(run):
+    first, _, first_counts, _, _ = run(JANUARY, ['2026-01'])
+    assert first_counts == {'reused': 0, 'reconciled': 4, 'removed': 0}
+
+    changed = JANUARY.copy()
+    changed.loc[1, 'BillableAmount'] = 9750.0
+    current, delta, counts, unmatched_employees, unmatched_customers = run(changed.iloc[:3], ['2026-01'])
+    assert counts == {'reused': 2, 'reconciled': 1, 'removed': 1}
+    assert len(current) == 3
+    # The corrected amount resolves a discrepancy; the dropped row had no rate to compare
+    assert len(delta['resolved']) == 1
+    assert list(unmatched_employees['name']) == []
+    assert list(unmatched_customers['name']) == []
+
+
+@pytest.mark.parametrize('stored', [None, JANUARY])
+def test_empty_month(run, stored):
+    if stored is not None:
+        run(stored, ['2026-01'])
+    current, delta, counts, unmatched_employees, unmatched_customers = run(EMPTY, ['2026-02'])
+    assert len(current) == 0
+    assert counts == {'reused': 0, 'reconciled': 0, 'removed': 0}
+    assert all(len(frame) == 0 for frame in delta.values())
+    assert len(unmatched_employees) == 0 and len(unmatched_customers) == 0
@@ -0,0 +1,43 @@
+"""
+Fuzzy matching parity with fuzzywuzzy's process.extractOne, skipped without fuzzywuzzy
+"""
+
+import random
+import pytest
+from Workflow.matching import extract_best
+
+fuzzywuzzy = pytest.importorskip('fuzzywuzzy')
+from fuzzywuzzy import fuzz, process
+
+
+# Workbook-style names with no-break spaces, symbols and Danish letters
+CHOICES = [
+    'Sam K\xa0Andersen', 'Sam K- Andersen', 'Søren Trøst Lauritsen', 'Anne\xa0Holm',
+    'Mette® Madsen', 'Lars © Jensen', 'Rune 5° Hoa', 'Ida Østergaard', 'José Nielsen',
+    'NORDIC FOODS APS', 'ACME\xa0A/S', 'VESTHAVN GROUP®', 'MARINE © DESIGN A/S'
+]
+QUERIES = [
+    'Sam K Andersen', 'Sam K\xa0Andersen', 'Soren Trost Lauritsen', 'Søren Trøst Lauritsen',
+    'Anne Holm', 'Mette Madsen', 'Lars Jensen', 'Rune 5 Hoa', 'Ida Ostergaard', 'Jose Nielsen',
+    'NORDIC FOODS APS', 'ACME A/S', 'VESTHAVN GROUP', 'MARINE DESIGN A/S', '®', ''
+]
+SCORERS = {'token_sort_ratio': fuzz.token_sort_ratio, 'ratio': fuzz.ratio}
+
+
+@pytest.mark.parametrize('scorer', SCORERS)
+def test_best_match_parity(scorer):
+    best, scores = extract_best(QUERIES, CHOICES, scorer)
+    for query, index, score in zip(QUERIES, best, scores):
+        match, expected = process.extractOne(query, CHOICES, scorer=SCORERS[scorer])
+        assert (CHOICES[index], score) == (match, expected), query
+
+
+@pytest.mark.parametrize('scorer', SCORERS)
+def test_random_pair_parity(scorer):
+    rnd = random.Random(0)
+    alphabet = 'abcdefgh ABC-.\xa0©®°øæéÅ'
+    for _ in range(3000):
+        query = ''.join(rnd.choices(alphabet, k=rnd.randint(1, 12)))
+        choice = ''.join(rnd.choices(alphabet, k=rnd.randint(1, 12)))
+        _, scores = extract_best([query], [choice], scorer)
+        assert scores[0] == process.extractOne(query, [choice], scorer=SCORERS[scorer])[1], (query, choice)
@@ -0,0 +1,24 @@
+"""
+Rate card export and reload
+"""
+
+import numpy as np
+import pandas as pd
+from Workflow.matching import RANK_ORDER
+from Workflow.rate_card import RateCard
+
+
+# Full-precision rates, some of which the default CSV float parser misreads
+RATES = np.random.default_rng(0).uniform(500, 2000, (200, len(RANK_ORDER)))
+REGULAR = pd.DataFrame(RATES, columns=RANK_ORDER).assign(customer=[f'Customer {i}' for i in range(200)])
+REGULAR.loc[0, 'Support'] = 'n/a'
+REGULAR.loc[1, 'Consultant'] = 0
+FCC = pd.DataFrame({'customer': ['Vesthavn Group'], 'Consultant': [1334.58534]})
+
+
+def test_save_load_round_trip(tmp_path):
+    rate_card = RateCard.from_pricing(REGULAR, FCC)
+    loaded = RateCard.load(rate_card.save(str(tmp_path / 'rate_card.csv')))
+    assert loaded.customers == rate_card.customers
+    np.testing.assert_array_equal(loaded.rates, rate_card.rates)
+    assert (loaded.ranks_used == rate_card.ranks_used).all()
@@ -0,0 +1,121 @@
+"""
+Server-side reconciliation against a local SQLite warehouse stand-in
+"""
+
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import Data.data_sources as data_sources
+from Data.data_sources import get_billable_data
+from Data.local_warehouse import SCHEMA
+from Workflow.aggregation import Aggregates
+from Workflow.alias_cache import AliasCache
+from Workflow.pricing import Pricing
+from Workflow.reconciliation import discrepancy_mask, reconcile_data
+from Workflow.server_side import reconcile_on_server
+
+
+EMPLOYEES = pd.DataFrame({
+    'name': ['Sam K Andersen', 'Anne Holm', 'Lars Jensen', 'Mette Madsen'],
+    'title': ['Senior dev', 'Junior BA', 'Principal BA', 'Data Scientist']
+})
+REGULAR = pd.DataFrame({
+    'customer': ['Acme A/S', 'Nordic Foods ApS'],
+    'Junior Consultant': [900, 850],
+    'Consultant': [1100, 0],
+    'Senior Consultant': [1300, 1250],
+    # Missing Principal price falls back to Senior
+    'Principal Consultant': [np.nan, 1500],
+    'Data Scientist': [1400, 1400],
+    'Support': [800, 800]
+})
+FCC = pd.DataFrame({'customer': ['Vesthavn Group'], 'Consultant': [1200]})
+
+CUSTOMERS = [(1, 'ACME A/S'), (2, 'Nordic Foods Aps'), (3, 'Vesthavn Group'), (4, 'Unknown Customer Ltd')]
+EMPLOYEES_SQL = [
+    (1, 'SKA - Sam K. Andersen'), (2, 'AH - Anne Holm'), (3, 'LJ - Lars Jensen'),
+    (4, 'MM - Mette Madsen'), (5, 'XX - Nobody Here')
+]
+# Date, CustomerKey, EmployeeKey, Hours, BillableRate, BillableAmount, IsBillableKey
+FACTS = [
+    ('2026-01-05 00:00:00', 1, 1, 7.5, 1300, 9750, 1),
+    ('2026-01-06 00:00:00', 1, 1, 7.5, 1200, 9000, 1),
+    ('2026-01-06 00:00:00', 1, 2, 4.0, 900, 3600, 1),
+    ('2026-01-07 00:00:00', 2, 3, 3.0, 1500, 4500, 1),
+    ('2026-01-08 00:00:00', 2, 4, 2.0, 1300, 2600, 1),
+    ('2026-01-09 00:00:00', 3, 1, 6.0, 1200, 7200, 1),
+    ('2026-01-09 00:00:00', 3, 5, 5.0, 1000, 5000, 1),
+    ('2026-01-12 00:00:00', 4, 2, 1.5, 900, 1350, 1),
+    ('2026-01-12 00:00:00', 1, 1, 2.0, 1300, 2600, 0),
+    ('2026-02-02 00:00:00', 1, 3, 8.0, 1300, 10400, 1),
+    ('2026-02-03 00:00:00', 2, 2, 7.5, 800, 6000, 1),
+    ('2026-02-03 00:00:00', 1, 5, 2.0, 1100, 2200, 1),
+    ('2026-02-04 00:00:00', 4, 4, 3.0, 1400, 4200, 1),
+    ('2026-03-01 00:00:00', 3, 2, 1.0, 1200, 1200, 1)
+]
+
+
+@pytest.fixture
+def warehouse(tmp_path, monkeypatch):
+    """Local warehouse file, selected as the data source for the test"""
+    path = str(tmp_path / 'warehouse.sqlite')
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO DimCustomer_Tabular_Flat VALUES (?, ?)", CUSTOMERS)
+    conn.executemany("INSERT INTO DimEmployee_Tabular_Flat VALUES (?, ?)", EMPLOYEES_SQL)
+    conn.executemany("INSERT INTO FactTable_HARVEST_Actual VALUES (?, ?, ?, ?, ?, ?, ?)", FACTS)
+    conn.commit()
+    conn.close()
+    
+    monkeypatch.setattr(config, 'DATA_SOURCE', 'local')
+    monkeypatch.setattr(config, 'LOCAL_WAREHOUSE_FILE', path)
+    monkeypatch.setattr(data_sources, '_source', None)
+    monkeypatch.setattr(data_sources, '_engine', None)
+    yield path
+    data_sources.reset_engine()
+
+
+@pytest.mark.parametrize('months', [None, ['2026-01'], ['2026-02', '2026-03']])
+def test_matches_reconcile_data(warehouse, months):
+    pricing = Pricing(EMPLOYEES, REGULAR, FCC)
+    alias_cache = AliasCache(':memory:', 'test')
+    results_df, unmatched_employees, unmatched_customers = reconcile_data(
+        get_billable_data(months=months), pricing, alias_cache
+    )
+    expected = Aggregates.from_results(results_df)
+    aggregates, server_employees, server_customers = reconcile_on_server(pricing, alias_cache, months=months)
+    alias_cache.close()
+    
+    assert aggregates.totals == pytest.approx(expected.totals)
+    
+    dimensions = ['customer', 'employee', 'month', 'rank']
+    pd.testing.assert_frame_equal(
+        aggregates.rollup(*dimensions).astype({column: object for column in dimensions}),
+        expected.rollup(*dimensions).astype({column: object for column in dimensions}),
+        check_dtype=False
+    )
+    
+    key = ['date', 'sql_customer', 'sql_employee', 'hours']
+    flagged = results_df[discrepancy_mask(results_df).to_numpy()]
+    assert len(flagged) > 0
+    pd.testing.assert_frame_equal(
+        _plain(aggregates.discrepancies).sort_values(key).reset_index(drop=True),
+        _plain(flagged)[list(aggregates.discrepancies.columns)].sort_values(key).reset_index(drop=True),
+        check_dtype=False
+    )
+    
+    for server, local in [(server_employees, unmatched_employees), (server_customers, unmatched_customers)]:
+        pd.testing.assert_frame_equal(
+            server.sort_values('name').reset_index(drop=True),
+            local.sort_values('name').reset_index(drop=True),
+            check_dtype=False
+        )
+
+
+def _plain(frame):
+    """Categoricals as objects, so frames compare by value"""
+    return frame.astype({
+        column: object for column, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)
+    })
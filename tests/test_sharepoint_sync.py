@@ -0,0 +1,101 @@
+"""
+SharePoint sync against a local HTTP stand-in for the workbook's host
+"""
+
+import json
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from Data.sharepoint_sync import HttpTransport, sync_pricing_file
+
+
+class WorkbookServer:
+    """Serves one file with an ETag and answers conditional GETs with 304"""
+    
+    def __init__(self, content, etag):
+        self.content = content
+        self.etag = etag
+        self.status = None
+        self.requests = []
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if server.status:
+                    self.send_response(server.status)
+                    self.end_headers()
+                    return
+                if self.headers.get('If-None-Match') == server.etag:
+                    self.send_response(304)
+                    self.send_header('ETag', server.etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', server.etag)
+                self.send_header('Last-Modified', 'Fri, 16 Oct 2026 08:00:00 GMT')
+                self.send_header('Content-Length', str(len(server.content)))
+                self.end_headers()
+                self.wfile.write(server.content)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/pricing.xlsx"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = WorkbookServer(b'workbook v1', '"v1"')
+    yield server
+    server.close()
+
+
+def test_downloads_then_skips_until_the_file_changes(server, tmp_path):
+    path = tmp_path / 'pricing.xlsx'
+    state_file = tmp_path / 'pricing_sync.json'
+    transport = HttpTransport(server.url)
+    
+    assert sync_pricing_file(transport, str(path), str(state_file))
+    assert path.read_bytes() == b'workbook v1'
+    assert json.loads(state_file.read_text())['etag'] == '"v1"'
+    
+    assert not sync_pricing_file(transport, str(path), str(state_file))
+    assert server.requests[-1]['If-None-Match'] == '"v1"'
+    assert path.read_bytes() == b'workbook v1'
+    
+    server.content, server.etag = b'workbook v2', '"v2"'
+    assert sync_pricing_file(transport, str(path), str(state_file))
+    assert path.read_bytes() == b'workbook v2'
+    assert json.loads(state_file.read_text())['etag'] == '"v2"'
+
+
+def test_missing_local_copy_is_downloaded_again(server, tmp_path):
+    path = tmp_path / 'pricing.xlsx'
+    state_file = tmp_path / 'pricing_sync.json'
+    transport = HttpTransport(server.url)
+    
+    sync_pricing_file(transport, str(path), str(state_file))
+    path.unlink()
+    assert sync_pricing_file(transport, str(path), str(state_file))
+    assert 'If-None-Match' not in server.requests[-1]
+    assert path.read_bytes() == b'workbook v1'
+
+
+def test_errors_propagate_and_leave_the_local_copy_alone(server, tmp_path):
+    path = tmp_path / 'pricing.xlsx'
+    state_file = tmp_path / 'pricing_sync.json'
+    transport = HttpTransport(server.url)
+    sync_pricing_file(transport, str(path), str(state_file))
+    
+    server.status = 401
+    with pytest.raises(urllib.error.HTTPError):
+        sync_pricing_file(transport, str(path), str(state_file))
+    assert path.read_bytes() == b'workbook v1'